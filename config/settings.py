@@ -21,12 +21,11 @@ SECRET_KEY = os.getenv('SECRET_KEY', '')
 ALLOWED_HOSTS = [h.strip() for h in os.getenv('ALLOWED_HOSTS', '').split(',') if h.strip()]
 
 # ——— DATABASE_URL и SQLite ———
-default_db = os.getenv('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
-parsed = urlparse(default_db)
+def _database_from_url(url):
+    parsed = urlparse(url)
 
-if parsed.scheme in ('postgres', 'postgresql'):
-    DATABASES = {
-        'default': {
+    if parsed.scheme in ('postgres', 'postgresql'):
+        return {
             'ENGINE': 'django.db.backends.postgresql',
             'NAME': parsed.path.lstrip('/'),
             'USER': parsed.username,
@@ -34,27 +33,43 @@ if parsed.scheme in ('postgres', 'postgresql'):
             'HOST': parsed.hostname,
             'PORT': parsed.port or '',
         }
-    }
-
-elif parsed.scheme == 'sqlite':
-    # Если путь абсолютный: sqlite:////home/user/db.sqlite3
-    # Если относительный: sqlite:///db.sqlite3
-    raw_path = parsed.path
-    if raw_path.startswith('/') and len(raw_path) > 1:
-        # Убираем ведущий слэш, чтобы объединить с BASE_DIR
-        db_file = raw_path.lstrip('/')
-    else:
-        db_file = raw_path or 'db.sqlite3'
-    DATABASES = {
-        'default': {
+
+    if parsed.scheme == 'sqlite':
+        # Если путь абсолютный: sqlite:////home/user/db.sqlite3
+        # Если относительный: sqlite:///db.sqlite3
+        raw_path = parsed.path
+        if raw_path.startswith('/') and len(raw_path) > 1:
+            # Убираем ведущий слэш, чтобы объединить с BASE_DIR
+            db_file = raw_path.lstrip('/')
+        else:
+            db_file = raw_path or 'db.sqlite3'
+        return {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': str(BASE_DIR / db_file),
         }
-    }
 
-else:
     raise RuntimeError(f"Unsupported DATABASE_URL scheme: {parsed.scheme}")
 
+
+default_db = os.getenv('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+DATABASES = {'default': _database_from_url(default_db)}
+
+# ——— Реплики для чтения меню (через запятую) ———
+# DATABASE_REPLICA_URLS=postgres://ro@replica1/db,postgres://ro@replica2/db
+replica_urls = [u.strip() for u in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+MENUS_REPLICAS = []
+for i, replica_url in enumerate(replica_urls, start=1):
+    alias = f'replica_{i}'
+    # В тестах реплика — зеркало default, отдельная тестовая БД не создаётся
+    DATABASES[alias] = {**_database_from_url(replica_url), 'TEST': {'MIRROR': 'default'}}
+    MENUS_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["menus.routers.MenuReplicaRouter"]
+# Сколько секунд после записи сессия редактора читает меню с primary
+MENUS_REPLICA_PIN_SECONDS = 10
+# На сколько секунд исключать недоступную реплику из ротации
+MENUS_REPLICA_RETRY_SECONDS = 30
+
 # Dev secret для тестового задания
 DEBUG = True
 ALLOWED_HOSTS = ["*"]
@@ -77,6 +92,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # read-your-writes: после записи запросы сессии читают меню с primary
+    "menus.middleware.ReplicaPinningMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -120,6 +137,23 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# ——— Кэш скомпилированных меню ———
+MENUS_CACHE_ENABLED = os.getenv('MENUS_CACHE_ENABLED', 'False').lower() in ('1', 'true', 'yes')
+# Лимиты процессного кэша: число меню и оценка памяти (вытеснение LRU)
+MENUS_CACHE_MAX_ENTRIES = int(os.getenv('MENUS_CACHE_MAX_ENTRIES', '1000'))
+MENUS_CACHE_MAX_BYTES = int(os.getenv('MENUS_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# кэш Django, в котором публикуются версии меню (общий для процессов при Redis/Memcached)
+MENUS_VERSION_CACHE = "default"
+# Загрузка меню без кэша: "full" — всё меню, "branch" — только видимая ветка (recursive CTE)
+MENUS_LOAD_STRATEGY = "full"
+# max-age неверсионного фрагмента меню /menus/<slug>/ (секунды)
+MENUS_FRAGMENT_MAX_AGE = 60
+# slug меню для /sitemap.xml (None — все меню)
+MENUS_SITEMAP = None
+# Системная проверка целостности меню (check --database, migrate); полный проход по MenuItem,
+# поэтому по умолчанию выключена — на больших таблицах используйте manage.py check_menus
+MENUS_INTEGRITY_SYSTEM_CHECK = False
+
 # Debug Toolbar — dev only
 if DEBUG:
     INSTALLED_APPS += ["debug_toolbar"]
@@ -3,7 +3,7 @@ from django.urls import path, include, re_path
 from django.shortcuts import render
 from django.conf import settings
 
-from menus.views import catalog_stub
+from menus.views import catalog_stub, menu_sitemap
 
 
 def page(request, slug=None):
@@ -11,6 +11,8 @@ def page(request, slug=None):
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("menus/", include("menus.urls")),
+    path("sitemap.xml", menu_sitemap, name="sitemap"),
     path("", page, name="home"),
     path("about/", page, {"slug": "about"}, name="about"),
     path("catalog/", page, {"slug": "catalog"}, name="catalog"),
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django import forms
-from .models import Menu, MenuItem
+from .keyset import KeysetChangeList
+from .models import Menu, MenuItem, MenuItemTranslation
+from .search import indexed_search
 
 
 class MenuItemAdminForm(forms.ModelForm):
@@ -37,7 +39,7 @@ class MenuItemInline(admin.TabularInline):
     Важный момент: фильтруем parent по текущему Menu (obj).
     """
     model = MenuItem
-    fields = ("title", "parent", "url", "named_url", "named_args", "named_kwargs", "order")
+    fields = ("title", "parent", "url", "named_url", "named_args", "named_kwargs", "order", "visibility")
     extra = 0
     show_change_link = True
 
@@ -58,6 +60,15 @@ class MenuItemInline(admin.TabularInline):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
+class MenuItemTranslationInline(admin.TabularInline):
+    """
+    Переводы заголовка и URL пункта; пустое поле — значение из самого пункта.
+    """
+    model = MenuItemTranslation
+    fields = ("language", "title", "url")
+    extra = 0
+
+
 @admin.register(Menu)
 class MenuAdmin(admin.ModelAdmin):
     list_display = ("title", "slug")
@@ -69,8 +80,25 @@ class MenuAdmin(admin.ModelAdmin):
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
     form = MenuItemAdminForm
-    list_display = ("title", "menu", "parent", "order")
-    list_filter = ("menu",)
+    list_display = ("title", "menu", "parent", "order", "visibility")
+    list_filter = ("menu", "visibility")
+    # группы и права учитываются только при видимости «Группам / правам»
+    filter_horizontal = ("groups", "permissions")
     search_fields = ("title", "url", "named_url")
     list_select_related = ("menu", "parent")
-    ordering = ("menu", "parent__id", "order", "id")
+    inlines = [MenuItemTranslationInline]
+    # порядок совпадает с индексом menus_item_admin_order: сортировка без JOIN
+    # к родителю, страницы changelist — по курсору (?after=) без OFFSET
+    ordering = ("menu_id", "parent_id", "order", "id")
+    keyset_fields = ordering
+    # COUNT(*) по всей таблице на миллионах строк дороже самой страницы
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        found = indexed_search(queryset, search_term)
+        if found is None:
+            return super().get_search_results(request, queryset, search_term)
+        return found, False
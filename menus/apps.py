@@ -5,3 +5,8 @@ class MenusConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "menus"
     verbose_name = "Меню"
+
+    def ready(self) -> None:
+        # Регистрация обработчиков сигналов (инкрементальное обновление кэша меню)
+        # и системной проверки целостности
+        from menus import checks, signals  # noqa: F401
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+from typing import Any, List, Optional, Set, Tuple
+
+from django.db import connections, router
+from django.urls import Resolver404, resolve
+
+from menus.models import Menu, MenuItem, MenuItemTranslation
+
+# Бэкенды с WITH RECURSIVE, для которых проверен SQL ниже
+_CTE_VENDORS = {"postgresql", "sqlite"}
+
+
+def supports_branch_loading() -> bool:
+    db = router.db_for_read(MenuItem)
+    return connections[db].vendor in _CTE_VENDORS
+
+
+def _json_variants(value: Any, empty: Any) -> Set[str]:
+    # Как named_args/named_kwargs обычно записаны: json.dumps с разными разделителями
+    variants = {json.dumps(value), json.dumps(value, separators=(",", ":")), json.dumps(value, sort_keys=True)}
+    if value == empty:
+        variants.add("")
+    return variants
+
+
+def _named_candidates(path_only: str) -> Tuple[str, List[str], List[str]]:
+    """
+    named_url и текстовые варианты args/kwargs, которые дал бы reverse() для path.
+    """
+    try:
+        match = resolve(path_only)
+    except Resolver404:
+        return "", [], []
+    if not match.url_name:
+        return "", [], []
+    # named_url хранит то, что принимает reverse(), т.е. имя с namespace ("admin:index");
+    # kwargs из extra-опций urlpatterns reverse() не принимает
+    return (
+        match.view_name,
+        sorted(_json_variants(list(match.args), [])),
+        sorted(_json_variants(dict(match.captured_kwargs), {})),
+    )
+
+
+def has_named_route(path_only: str) -> bool:
+    """Путь разрешается в именованный URL — активный пункт мог быть задан через named_url."""
+    return bool(_named_candidates(path_only)[0])
+
+
+def _in_clause(values: List[str]) -> str:
+    return ", ".join(["%s"] * len(values))
+
+
+def load_branch(slug: str, full_path: str, path_only: str, language: Optional[str] = None) -> List[MenuItem]:
+    """
+    Видимый срез меню одним запросом (WITH RECURSIVE), без изменения схемы:
+    корни, цепочка предков пунктов-кандидатов на активный (по url или
+    named_url + args/kwargs текущего пути) с их соседями, дети кандидатов
+    и дети этих детей (первый уровень детей активного раскрыт).
+    Окончательный выбор активного делает _mark_active_and_expand по resolved_url.
+    С language перевод приходит в том же запросе (tr_title/tr_url, как в load_items),
+    а кандидаты ищутся и по переведённому url.
+    """
+    db = router.db_for_read(MenuItem)
+    qn = connections[db].ops.quote_name
+    item_table = qn(MenuItem._meta.db_table)
+    menu_table = qn(Menu._meta.db_table)
+    translation_table = qn(MenuItemTranslation._meta.db_table)
+    order = qn("order")
+
+    urls = list(dict.fromkeys([full_path, path_only]))
+    named_url, arg_variants, kwarg_variants = _named_candidates(path_only)
+
+    anchor_where = f"i.url IN ({_in_clause(urls)})"
+    anchor_params: List[Any] = [*urls]
+    if named_url:
+        anchor_where += (
+            f" OR (i.named_url = %s AND i.named_args IN ({_in_clause(arg_variants)})"
+            f" AND i.named_kwargs IN ({_in_clause(kwarg_variants)}))"
+        )
+        anchor_params += [named_url, *arg_variants, *kwarg_variants]
+    select = "i.*"
+    join = ""
+    join_params: List[Any] = []
+    if language is not None:
+        anchor_where += (
+            f" OR i.id IN (SELECT item_id FROM {translation_table}"
+            f" WHERE language = %s AND url IN ({_in_clause(urls)}))"
+        )
+        anchor_params += [language, *urls]
+        select = "i.*, t.title AS tr_title, t.url AS tr_url"
+        join = f"LEFT JOIN {translation_table} t ON t.item_id = i.id AND t.language = %s"
+        join_params = [language]
+
+    sql = f"""
+        WITH RECURSIVE
+        target(id) AS (
+            SELECT id FROM {menu_table} WHERE slug = %s
+        ),
+        anchor(id) AS (
+            SELECT i.id FROM {item_table} i
+            WHERE i.menu_id = (SELECT id FROM target) AND ({anchor_where})
+        ),
+        chain(id, parent_id) AS (
+            SELECT i.id, i.parent_id FROM {item_table} i JOIN anchor a ON i.id = a.id
+            UNION
+            SELECT p.id, p.parent_id FROM {item_table} p JOIN chain c ON p.id = c.parent_id
+        )
+        SELECT {select} FROM {item_table} i {join}
+        WHERE i.menu_id = (SELECT id FROM target) AND (
+            i.parent_id IS NULL
+            OR i.id IN (SELECT id FROM chain)
+            OR i.parent_id IN (SELECT id FROM chain)
+            OR i.parent_id IN (SELECT c.id FROM {item_table} c JOIN anchor a ON c.parent_id = a.id)
+        )
+        ORDER BY i.parent_id, i.{order}, i.id
+    """
+    return list(MenuItem.objects.db_manager(db).raw(sql, [slug, *anchor_params, *join_params]))
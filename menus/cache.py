@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, FilteredRelation, Q
+from django.utils.translation import get_language, get_supported_language_variant
+
+from menus.compiled import CompiledMenu, DeltaError, compile_menu
+from menus.models import Menu, MenuItem
+from menus.visibility import load_rules
+
+_VERSION_KEY = "menus:version:{slug}"
+
+# Ключ записи процессного кэша: (slug, язык)
+CacheKey = Tuple[str, Optional[str]]
+
+
+def cache_enabled() -> bool:
+    return getattr(settings, "MENUS_CACHE_ENABLED", False)
+
+
+def version_cache():
+    return caches[getattr(settings, "MENUS_VERSION_CACHE", "default")]
+
+
+def current_language() -> Optional[str]:
+    """
+    Активный язык в виде кода из settings.LANGUAGES ("ru-ru" -> "ru");
+    None — i18n выключен, переводы не используются.
+    """
+    if not settings.USE_I18N:
+        return None
+    language = get_language()
+    if language is None:
+        return None
+    try:
+        return get_supported_language_variant(language)
+    except LookupError:
+        return language
+
+
+def load_items(
+    slugs: Iterable[str], language: Optional[str] = None, using: Optional[str] = None,
+) -> Dict[str, List[MenuItem]]:
+    """
+    Пункты для нескольких меню ОДНИМ запросом, сгруппированные по slug.
+    Даже для пустого/несуществующего меню возвращается пустой список.
+    С language перевод на этот язык приходит в том же запросе (LEFT JOIN)
+    аннотациями tr_title/tr_url. using — база явно (иначе решает роутер).
+    """
+    slugs = list(slugs)
+    grouped: Dict[str, List[MenuItem]] = {slug: [] for slug in slugs}
+    if not slugs:
+        return grouped
+    qs = MenuItem.objects.db_manager(using).select_related("parent", "menu")
+    if language is not None:
+        qs = qs.annotate(
+            current_translation=FilteredRelation("translations", condition=Q(translations__language=language)),
+            tr_title=F("current_translation__title"),
+            tr_url=F("current_translation__url"),
+        )
+    if len(slugs) == 1:
+        qs = qs.filter(menu__slug=slugs[0]).order_by("parent__id", "order", "id")
+    else:
+        qs = qs.filter(menu__slug__in=slugs).order_by("menu__slug", "parent__id", "order", "id")
+    for it in qs:
+        grouped[it.menu.slug].append(it)
+    return grouped
+
+
+def compile_many(
+    slugs: Iterable[str],
+    versions: Optional[Dict[str, int]] = None,
+    language: Optional[str] = None,
+    using: Optional[str] = None,
+) -> Dict[str, CompiledMenu]:
+    """
+    Загрузка и компиляция нескольких меню на одном языке: 1 запрос на пункты
+    вместе с переводами (+2 на группы/права, только если есть пункты RESTRICTED).
+    """
+    grouped = load_items(slugs, language, using)
+    rules = load_rules((it for items in grouped.values() for it in items), using)
+    versions = versions or {}
+    return {
+        slug: compile_menu(slug, items, version=versions.get(slug, 0), rules=rules, language=language)
+        for slug, items in grouped.items()
+    }
+
+
+class MenuCache:
+    """
+    Процессный кэш скомпилированных деревьев меню.
+
+    Дерево хранится отдельно для каждого языка: ключ (slug, язык), версия
+    у всех языков меню общая. Текущая версия публикуется в кэше Django
+    (MENUS_VERSION_CACHE), поэтому другие процессы замечают изменения и пересобирают дерево.
+    В своём процессе правки одного пункта применяются дельтой ко всем языкам
+    (apply_save/apply_delete), полная пересборка — только если дельта невозможна.
+
+    Кэш ограничен по числу меню (MENUS_CACHE_MAX_ENTRIES) и по оценке памяти
+    (MENUS_CACHE_MAX_BYTES); при превышении вытесняются давно не читанные (LRU).
+    """
+
+    def __init__(self) -> None:
+        self._menus: "OrderedDict[CacheKey, CompiledMenu]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._by_menu_id: Dict[int, str] = {}
+        self._languages: Dict[str, Set[Optional[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ----------------------- ХРАНИЛИЩЕ -----------------------
+
+    @staticmethod
+    def _key(compiled: CompiledMenu) -> CacheKey:
+        return (compiled.slug, compiled.language)
+
+    def _put(self, compiled: CompiledMenu) -> None:
+        key = self._key(compiled)
+        self._pop(key)
+        self._menus[key] = compiled
+        self._bytes += compiled.size
+        self._languages.setdefault(compiled.slug, set()).add(compiled.language)
+        if compiled.menu_id is not None:
+            self._by_menu_id[compiled.menu_id] = compiled.slug
+        self._evict()
+
+    def _pop(self, key: CacheKey) -> Optional[CompiledMenu]:
+        compiled = self._menus.pop(key, None)
+        if compiled is None:
+            return None
+        self._bytes -= compiled.size
+        slug, language = key
+        languages = self._languages.get(slug, set())
+        languages.discard(language)
+        if not languages:
+            self._languages.pop(slug, None)
+            if self._by_menu_id.get(compiled.menu_id) == slug:
+                del self._by_menu_id[compiled.menu_id]
+        return compiled
+
+    def _entries(self, slug: str) -> List[CompiledMenu]:
+        # Все языковые версии меню, собранные в этом процессе
+        return [self._menus[(slug, language)] for language in self._languages.get(slug, ())]
+
+    def _pop_all(self, slug: str) -> None:
+        for language in list(self._languages.get(slug, ())):
+            self._pop((slug, language))
+
+    def _evict(self) -> None:
+        max_entries = getattr(settings, "MENUS_CACHE_MAX_ENTRIES", 1000)
+        max_bytes = getattr(settings, "MENUS_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+        # Последнее добавленное меню не вытесняем, даже если оно одно больше лимита
+        while len(self._menus) > 1 and (len(self._menus) > max_entries or self._bytes > max_bytes):
+            self._pop(next(iter(self._menus)))
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._menus),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    # ----------------------- ВЕРСИИ -----------------------
+
+    def _shared_versions(self, slugs: List[str]) -> Dict[str, int]:
+        keys = {_VERSION_KEY.format(slug=s): s for s in slugs}
+        found = version_cache().get_many(list(keys))
+        return {keys[k]: v for k, v in found.items()}
+
+    @staticmethod
+    def _new_version() -> int:
+        # Версия для отсутствующего ключа — время в нс, а не 1: ключ мог быть
+        # вытеснен из кэша, и счётчик, начатый заново, повторил бы версию,
+        # под которой в другом процессе лежит уже устаревшее дерево.
+        return time.time_ns()
+
+    def _bump(self, slug: str) -> int:
+        vcache = version_cache()
+        key = _VERSION_KEY.format(slug=slug)
+        try:
+            return vcache.incr(key)
+        except ValueError:
+            version = self._new_version()
+            vcache.add(key, version, timeout=None)
+            return vcache.get(key, version)
+
+    # ----------------------- ЧТЕНИЕ -----------------------
+
+    def get_many(self, slugs: Iterable[str], language: Optional[str] = None) -> Dict[str, CompiledMenu]:
+        """
+        Скомпилированные меню для набора slug на языке language (по умолчанию —
+        активном); отсутствующие или устаревшие собираются одним общим запросом.
+        """
+        if language is None:
+            language = current_language()
+        slugs = [s for s in dict.fromkeys(slugs) if s]
+        versions = self._shared_versions(slugs)
+        result: Dict[str, CompiledMenu] = {}
+        missing: List[str] = []
+        with self._lock:
+            for slug in slugs:
+                compiled = self._menus.get((slug, language))
+                # нет ключа версии (вытеснен) — изменения могли пройти мимо: пересборка
+                if compiled is not None and compiled.version == versions.get(slug):
+                    self._menus.move_to_end((slug, language))
+                    result[slug] = compiled
+                else:
+                    missing.append(slug)
+            self.hits += len(result)
+            self.misses += len(missing)
+        if missing:
+            # версию фиксируем ДО запроса: правка во время загрузки даст новую версию
+            for slug in missing:
+                if slug not in versions:
+                    version_cache().add(_VERSION_KEY.format(slug=slug), self._new_version(), timeout=None)
+            versions.update(self._shared_versions(missing))
+            # Дерево живёт в кэше до следующей правки, а новая версия публикуется
+            # сразу после коммита — отстающая реплика закэшировала бы старое меню
+            # под новой версией. Поэтому сборка для кэша читает только primary.
+            compiled_menus = compile_many(missing, versions, language, using=DEFAULT_DB_ALIAS)
+            with self._lock:
+                for slug, compiled in compiled_menus.items():
+                    self._put(compiled)
+                    result[slug] = compiled
+        return result
+
+    def contains(self, slug: str) -> bool:
+        """Меню с пунктами уже собрано в этом процессе — значит, оно существует."""
+        with self._lock:
+            return any(c.menu_id is not None for c in self._entries(slug))
+
+    def get(self, slug: str, language: Optional[str] = None) -> CompiledMenu:
+        return self.get_many([slug], language)[slug]
+
+    # ----------------------- ИНВАЛИДАЦИЯ -----------------------
+
+    def invalidate(self, slug: str) -> None:
+        """
+        Полный сброс меню (для bulk-операций, QuerySet.update() и т.п.,
+        которые не отправляют сигналы).
+        """
+        with self._lock:
+            self._pop_all(slug)
+        self._bump(slug)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._menus.clear()
+            self._by_menu_id.clear()
+            self._languages.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def _moved_from(self, item_id: int, menu_id: int) -> Optional[CompiledMenu]:
+        """
+        Дерево другого меню, в котором ещё лежит пункт (перенос между меню).
+        Обычно пункт найден в своём меню через _by_menu_id, и остальные меню
+        не просматриваются; полный проход — только если его там нет.
+        """
+        slug = self._by_menu_id.get(menu_id)
+        if slug is not None and any(item_id in c.items for c in self._entries(slug)):
+            return None
+        for compiled in self._menus.values():
+            if compiled.menu_id != menu_id and item_id in compiled.items:
+                return compiled
+        return None
+
+    def _drop(self, slug: str) -> None:
+        self._pop_all(slug)
+        self._bump(slug)
+
+    def _apply(self, slug: str, delta) -> None:
+        # Дельта применяется к каждому языку меню, только если с момента сборки
+        # никто (в т.ч. другой процесс) не публиковал новых версий. Читатели
+        # работают без блокировки, поэтому дельта меняет копию, а в кэш она
+        # попадает одним присваиванием уже целиком, под новой версией.
+        version = self._bump(slug)
+        for compiled in self._entries(slug):
+            key = self._key(compiled)
+            patched = compiled.copy()
+            try:
+                if version != compiled.version + 1:
+                    raise DeltaError("version moved concurrently")
+                delta(patched)
+            except DeltaError:
+                self._pop(key)
+                continue
+            patched.version = version
+            self._menus[key] = patched
+            self._bytes += patched.size - compiled.size
+        self._evict()
+
+    @staticmethod
+    def _menu_slug(menu_id: int) -> Optional[str]:
+        return Menu.objects.filter(pk=menu_id).values_list("slug", flat=True).first()
+
+    def item_saved(self, item: MenuItem, created: bool = False) -> None:
+        with self._lock:
+            if item.pk is None:
+                # объект уже удалён — дельту строить не из чего
+                slug = self._by_menu_id.get(item.menu_id) or self._menu_slug(item.menu_id)
+                if slug is not None:
+                    self._drop(slug)
+                return
+            # новый пункт ни в одном дереве быть не может
+            previous = None if created else self._moved_from(item.id, item.menu_id)
+            if previous is not None:
+                # пункт перенесён в другое меню — старое пересобираем целиком
+                self._drop(previous.slug)
+            slug = self._by_menu_id.get(item.menu_id)
+            if slug is None:
+                # в этом процессе меню не собрано (или пустое) — только публикуем версию
+                slug = self._menu_slug(item.menu_id)
+                if slug is not None:
+                    self._drop(slug)
+                return
+            if item.get_deferred_fields():
+                self._drop(slug)
+                return
+            # URL считается на языке каждого дерева, с его переводом пункта
+            self._apply(slug, lambda c: c.apply_save(item, c.resolve_url(item), created))
+
+    def item_deleted(self, item_id: int, menu_id: int) -> None:
+        with self._lock:
+            slug = self._by_menu_id.get(menu_id)
+            if slug is None:
+                slug = self._menu_slug(menu_id)
+                if slug is not None:
+                    self._drop(slug)
+            elif any(item_id in c.items for c in self._entries(slug)):
+                self._apply(slug, lambda c: c.apply_delete(item_id))
+            # иначе пункт уже удалён вместе с поддеревом родителя
+
+    def rules_changed(self, menu_ids: Iterable[int]) -> None:
+        """Группы/права или переводы пунктов изменились — меню пересобирается."""
+        with self._lock:
+            for menu_id in menu_ids:
+                slug = self._by_menu_id.get(menu_id) or self._menu_slug(menu_id)
+                if slug is not None:
+                    self._drop(slug)
+
+    def menu_changed(self, menu_id: int, slug: str) -> None:
+        with self._lock:
+            cached_slug = self._by_menu_id.get(menu_id)
+            if cached_slug is not None:
+                self._drop(cached_slug)
+            self._drop(slug)
+
+
+menu_cache = MenuCache()
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+
+from menus.cache import cache_enabled, version_cache
+from menus.integrity import check_menus
+from menus.models import MenuItem
+
+
+@checks.register("menus", checks.Tags.database)
+def check_menu_integrity(app_configs=None, databases=None, **kwargs):
+    """
+    Системная проверка целостности меню. Как и другие database-проверки Django,
+    выполняется только при явном запросе: manage.py check --database default
+    (а также в migrate — поэтому до создания таблиц проверка пропускается).
+    Это полный проход по MenuItem, поэтому включается явно:
+    MENUS_INTEGRITY_SYSTEM_CHECK = True; иначе — manage.py check_menus.
+    """
+    if not databases or not getattr(settings, "MENUS_INTEGRITY_SYSTEM_CHECK", False):
+        return []
+    if not any(MenuItem._meta.db_table in connections[db].introspection.table_names() for db in databases):
+        return []
+    report = check_menus()
+    hint = "Запустите manage.py check_menus --repair"
+    problems = [
+        ("menus.W001", report.cross_menu, "Пункты меню с родителем из другого меню: {n}"),
+        ("menus.W002", report.orphans, "Пункты меню с несуществующим родителем: {n}"),
+        ("menus.W003", report.cycles, "Циклы в дереве меню (пункты не отображаются): {n}"),
+    ]
+    messages = [
+        checks.Warning(text.format(n=len(rows)), hint=hint, id=check_id)
+        for check_id, rows, text in problems
+        if rows
+    ]
+    if report.duplicate_urls:
+        messages.append(checks.Warning(
+            f"Дубликаты URL внутри меню: {len(report.duplicate_urls)}",
+            hint="manage.py check_menus покажет список",
+            id="menus.W004",
+        ))
+    return messages
+
+
+@checks.register("menus", checks.Tags.caches)
+def check_version_cache(app_configs=None, **kwargs):
+    """
+    Версии меню должны лежать в общем для процессов кэше: с LocMemCache правка
+    в одном воркере не видна остальным, и они отдают старое меню до перезапуска.
+    """
+    if not cache_enabled() or not isinstance(version_cache(), LocMemCache):
+        return []
+    return [checks.Warning(
+        "MENUS_CACHE_ENABLED: версии меню хранятся в LocMemCache — у каждого процесса свои",
+        hint="Укажите в MENUS_VERSION_CACHE общий кэш (Redis, Memcached, база); "
+             "с одним процессом предупреждение можно отключить через SILENCED_SYSTEM_CHECKS",
+        id="menus.W005",
+    )]
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+from bisect import insort
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from django.utils.translation import override
+
+from menus.models import MenuItem
+
+
+class DeltaError(Exception):
+    """
+    Дельту нельзя безопасно применить к скомпилированному дереву —
+    вызывающий код должен сделать полную пересборку.
+    """
+
+
+@dataclass(frozen=True)
+class ItemRule:
+    """Правило видимости непубличного пункта (см. MenuItem.Visibility)."""
+    visibility: str
+    groups: FrozenSet[int] = frozenset()
+    permissions: FrozenSet[str] = frozenset()
+
+
+def _sort_key(item: MenuItem) -> Tuple[int, int]:
+    return (item.order, item.id)
+
+
+# Оценка памяти одного пункта в скомпилированном дереве (экземпляр модели
+# с select_related-родителем, записи в словарях индексов), замерено tracemalloc
+_ITEM_OVERHEAD = 1600
+
+
+# (title, url) перевода; пустая строка — значение из самого пункта
+Translation = Tuple[str, str]
+
+
+def item_size(item: MenuItem, url: str, translation: Optional[Translation] = None) -> int:
+    """Оценка в байтах; строки считаются по длине, остальное — константой."""
+    text = len(item.title) + len(item.url) + len(item.named_url) + len(item.named_args) + len(item.named_kwargs)
+    if translation is not None:
+        text += len(translation[0]) + len(translation[1])
+    return _ITEM_OVERHEAD + text + len(url)
+
+
+def _localized_url(item: MenuItem, translation: Optional[Translation]) -> str:
+    # Язык должен быть уже активирован вызывающим кодом
+    return item.resolve_url(translation[1] if translation and translation[1] else item.url)
+
+
+def _language_override(language: Optional[str]):
+    return override(language) if language is not None else nullcontext()
+
+
+@dataclass
+class CompiledMenu:
+    """
+    Скомпилированное дерево одного меню на одном языке: разделяемое между
+    запросами, не содержит никакого состояния, зависящего от текущего URL.
+
+    children[None] — корни; списки детей отсортированы по (order, id).
+    url_index — resolved_url -> множество id (дубликаты URL допустимы).
+    size — оценка занимаемой памяти в байтах, поддерживается дельтами.
+    rules — правила только для непубличных пунктов; masks — кэш скрытых id
+    по ключу аудитории (menus/visibility.py), сбрасывается любой дельтой.
+    translations — переводы пунктов на language; urls уже посчитаны на этом языке.
+    Узлы, недостижимые от корней (циклы), в дерево не попадают.
+
+    Опубликованное (лежащее в кэше) дерево читается без блокировок и не меняется:
+    дельты применяются к copy(), а копия публикуется под новой версией.
+    """
+    slug: str
+    menu_id: Optional[int]
+    version: int
+    items: Dict[int, MenuItem] = field(default_factory=dict)
+    urls: Dict[int, str] = field(default_factory=dict)
+    parents: Dict[int, Optional[int]] = field(default_factory=dict)
+    children: Dict[Optional[int], List[Tuple[Tuple[int, int], int]]] = field(default_factory=dict)
+    url_index: Dict[str, Set[int]] = field(default_factory=dict)
+    size: int = 0
+    rules: Dict[int, ItemRule] = field(default_factory=dict)
+    masks: Dict[tuple, FrozenSet[int]] = field(default_factory=dict)
+    # объединение групп и прав из rules; дельты меняют только AUTHENTICATED-правила
+    rule_refs: Optional[Tuple[FrozenSet[int], FrozenSet[str]]] = None
+    language: Optional[str] = None
+    translations: Dict[int, Translation] = field(default_factory=dict)
+
+    # ----------------------- ЧТЕНИЕ -----------------------
+
+    def title(self, item_id: int) -> str:
+        translation = self.translations.get(item_id)
+        if translation is not None and translation[0]:
+            return translation[0]
+        return self.items[item_id].title
+
+    def resolve_url(self, item: MenuItem) -> str:
+        """resolved_url пункта на языке меню, с учётом сохранённого перевода."""
+        with _language_override(self.language):
+            return _localized_url(item, self.translations.get(item.id))
+
+    def child_ids(self, parent_id: Optional[int]) -> List[int]:
+        return [cid for _, cid in self.children.get(parent_id, ())]
+
+    def ancestors(self, item_id: int) -> List[int]:
+        """Цепочка предков от ближайшего к корню."""
+        chain: List[int] = []
+        pid = self.parents.get(item_id)
+        while pid is not None:
+            chain.append(pid)
+            pid = self.parents.get(pid)
+        return chain
+
+    def _dfs_key(self, item_id: int) -> List[Tuple[int, int]]:
+        # Позиция узла в обходе в глубину: путь из ключей сортировки от корня
+        path = [item_id, *self.ancestors(item_id)]
+        return [_sort_key(self.items[i]) for i in reversed(path)]
+
+    def find_by_url(self, url: str, hidden: FrozenSet[int] = frozenset()) -> Optional[int]:
+        """
+        Видимый узел с данным URL. При дубликатах — первый в порядке обхода
+        дерева, как и при отрисовке.
+        """
+        ids = self.url_index.get(url)
+        if ids and hidden:
+            ids = ids - hidden
+        if not ids:
+            return None
+        if len(ids) == 1:
+            return next(iter(ids))
+        return min(ids, key=self._dfs_key)
+
+    def walk(self, parent_id: Optional[int] = None) -> Iterable[Tuple[int, int]]:
+        """
+        Итеративный обход в глубину: пары (id, depth). Не строит промежуточных
+        списков, поэтому годится для очень больших меню.
+        """
+        stack = [(cid, 0) for cid in reversed(self.child_ids(parent_id))]
+        while stack:
+            item_id, depth = stack.pop()
+            yield item_id, depth
+            stack.extend((cid, depth + 1) for cid in reversed(self.child_ids(item_id)))
+
+    # ----------------------- ДЕЛЬТЫ -----------------------
+
+    def copy(self) -> "CompiledMenu":
+        """
+        Копия для применения дельты: словари индексов копируются, пункты, списки
+        детей и множества url_index — общие (дельты их заменяют, а не изменяют).
+        """
+        return CompiledMenu(
+            slug=self.slug,
+            menu_id=self.menu_id,
+            version=self.version,
+            items=dict(self.items),
+            urls=dict(self.urls),
+            parents=dict(self.parents),
+            children=dict(self.children),
+            url_index=dict(self.url_index),
+            size=self.size,
+            rules=dict(self.rules),
+            rule_refs=self.rule_refs,
+            language=self.language,
+            translations=dict(self.translations),
+        )
+
+    def _index_url(self, item_id: int, url: str) -> None:
+        self.urls[item_id] = url
+        self.url_index[url] = self.url_index.get(url, set()) | {item_id}
+
+    def _unindex_url(self, item_id: int) -> None:
+        url = self.urls.pop(item_id, None)
+        if url is None:
+            return
+        rest = self.url_index.get(url, set()) - {item_id}
+        if rest:
+            self.url_index[url] = rest
+        else:
+            self.url_index.pop(url, None)
+
+    def _attach(self, item: MenuItem, parent_id: Optional[int]) -> None:
+        # Новый список вместо мутации: список может быть общим с опубликованным деревом
+        siblings = list(self.children.get(parent_id, ()))
+        insort(siblings, (_sort_key(item), item.id))
+        self.children[parent_id] = siblings
+        self.parents[item.id] = parent_id
+
+    def _detach(self, item_id: int) -> None:
+        parent_id = self.parents[item_id]
+        self.children[parent_id] = [s for s in self.children.get(parent_id, ()) if s[1] != item_id]
+
+    def apply_save(self, item: MenuItem, url: str, created: bool = True) -> None:
+        """
+        Вставка, изменение или перемещение одного пункта за O(depth + siblings).
+        Только для неопубликованной копии (copy()). created — флаг post_save:
+        существующий пункт, которого нет в дереве (был в цикле), вставлять нельзя —
+        его поддерево тоже не загружено.
+        """
+        if item.menu_id != self.menu_id:
+            raise DeltaError("item belongs to another menu")
+        parent_id = item.parent_id
+        if parent_id is not None and parent_id not in self.items:
+            raise DeltaError("parent is not in the compiled tree")
+        if not created and item.id not in self.items:
+            raise DeltaError("existing item is not in the compiled tree")
+        restricted = MenuItem.Visibility.RESTRICTED
+        if item.visibility == restricted or getattr(self.rules.get(item.id), "visibility", None) == restricted:
+            # группы и права хранятся в M2M и в post_save ещё не известны
+            raise DeltaError("group/permission rules require a reload")
+        self.masks = {}
+        if item.visibility == MenuItem.Visibility.AUTHENTICATED:
+            self.rules[item.id] = ItemRule(item.visibility)
+        else:
+            self.rules.pop(item.id, None)
+
+        old = self.items.get(item.id)
+        if old is None:
+            self.items[item.id] = item
+            self._attach(item, parent_id)
+            self._index_url(item.id, url)
+            self.size += item_size(item, url)
+            return
+
+        if parent_id is not None and (parent_id == item.id or item.id in self.ancestors(parent_id)):
+            raise DeltaError("move would create a cycle")
+
+        if old.parent_id != parent_id or _sort_key(old) != _sort_key(item):
+            self._detach(item.id)
+            self.items[item.id] = item
+            self._attach(item, parent_id)
+        else:
+            self.items[item.id] = item
+
+        translation = self.translations.get(item.id)
+        self.size += item_size(item, url, translation) - item_size(old, self.urls[item.id], translation)
+        if self.urls[item.id] != url:
+            self._unindex_url(item.id)
+            self._index_url(item.id, url)
+
+    def apply_delete(self, item_id: int) -> None:
+        """
+        Удаление пункта вместе с поддеревом (каскад в БД удаляет и детей).
+        Только для неопубликованной копии (copy()).
+        """
+        if item_id not in self.items:
+            return
+        self.masks = {}
+        self._detach(item_id)
+        for sub_id, _ in [(item_id, 0), *self.walk(item_id)]:
+            self.rules.pop(sub_id, None)
+            self.size -= item_size(self.items[sub_id], self.urls[sub_id], self.translations.pop(sub_id, None))
+            self.children.pop(sub_id, None)
+            self.parents.pop(sub_id, None)
+            self.items.pop(sub_id, None)
+            self._unindex_url(sub_id)
+
+
+def compile_menu(
+    slug: str,
+    items: Iterable[MenuItem],
+    version: int = 0,
+    menu_id: Optional[int] = None,
+    rules: Optional[Dict[int, ItemRule]] = None,
+    language: Optional[str] = None,
+) -> CompiledMenu:
+    """
+    Строит CompiledMenu из плоского списка пунктов за O(n log n).
+    Пункты с родителем вне набора становятся корнями (как и раньше в _build_tree).
+    rules — правила видимости (menus.visibility.load_rules); без них
+    правила «только авторизованным» берутся из самих пунктов.
+    language — URL считаются на этом языке; переводы берутся из аннотаций
+    tr_title/tr_url (menus.cache.load_items), язык активируется один раз на всё меню.
+    """
+    items = list(items)
+    if menu_id is None and items:
+        menu_id = items[0].menu_id
+    by_id: Dict[int, MenuItem] = {it.id: it for it in items}
+
+    raw_children: Dict[Optional[int], List[Tuple[Tuple[int, int], int]]] = {}
+    for it in items:
+        pid = it.parent_id if it.parent_id in by_id else None
+        raw_children.setdefault(pid, []).append((_sort_key(it), it.id))
+    for siblings in raw_children.values():
+        siblings.sort()
+
+    compiled = CompiledMenu(slug=slug, menu_id=menu_id, version=version, language=language)
+    compiled.children = {None: raw_children.get(None, [])}
+
+    with _language_override(language):
+        # Оставляем только узлы, достижимые от корней: циклы отбрасываются
+        stack: List[Tuple[int, Optional[int]]] = [(cid, None) for _, cid in compiled.children[None]]
+        while stack:
+            item_id, parent_id = stack.pop()
+            if item_id in compiled.items:
+                continue
+            item = by_id[item_id]
+            compiled.items[item_id] = item
+            compiled.parents[item_id] = parent_id
+            translation = None
+            if getattr(item, "tr_title", None) or getattr(item, "tr_url", None):
+                translation = compiled.translations[item_id] = (item.tr_title or "", item.tr_url or "")
+            url = _localized_url(item, translation)
+            compiled._index_url(item_id, url)
+            compiled.size += item_size(item, url, translation)
+            rule = rules.get(item_id) if rules is not None else None
+            if rule is None and item.visibility != MenuItem.Visibility.PUBLIC:
+                rule = ItemRule(item.visibility)
+            if rule is not None:
+                compiled.rules[item_id] = rule
+            kids = raw_children.get(item_id)
+            if kids:
+                compiled.children[item_id] = kids
+                stack.extend((cid, item_id) for _, cid in kids)
+    return compiled
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from menus.cache import menu_cache
+from menus.models import Menu, MenuItem
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+@dataclass
+class IntegrityReport:
+    """
+    Результат проверки целостности всех меню.
+    Списки содержат словари, пригодные для json.dumps.
+    """
+    checked: int = 0
+    cross_menu: List[Dict] = field(default_factory=list)
+    orphans: List[Dict] = field(default_factory=list)
+    cycles: List[List[int]] = field(default_factory=list)
+    duplicate_urls: List[Dict] = field(default_factory=list)
+    repaired: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.cross_menu or self.orphans or self.cycles or self.duplicate_urls)
+
+    def as_dict(self) -> Dict:
+        data = asdict(self)
+        data["ok"] = self.ok
+        return data
+
+
+def _iter_menus(batch_size: int) -> Iterator[Tuple[int, List[Tuple[int, Optional[int]]]]]:
+    """
+    Пункты, сгруппированные по меню: (menu_id, [(id, parent_id), ...]).
+    Keyset-пагинация по (menu_id, id): постоянная стоимость батча на любых
+    объёмах, в памяти — только строки одного меню.
+    """
+    menu_id: Optional[int] = None
+    rows: List[Tuple[int, Optional[int]]] = []
+    after = Q()
+    while True:
+        batch = list(
+            MenuItem.objects.filter(after)
+            .order_by("menu_id", "id")
+            .values_list("menu_id", "id", "parent_id")[:batch_size]
+        )
+        for row_menu_id, item_id, parent_id in batch:
+            if row_menu_id != menu_id:
+                if rows:
+                    yield menu_id, rows
+                menu_id, rows = row_menu_id, []
+            rows.append((item_id, parent_id))
+        if len(batch) < batch_size:
+            break
+        last_menu_id, last_id, _ = batch[-1]
+        after = Q(menu_id__gt=last_menu_id) | Q(menu_id=last_menu_id, id__gt=last_id)
+    if rows:
+        yield menu_id, rows
+
+
+def _find_cycles(parents: Dict[int, Optional[int]]) -> List[List[int]]:
+    """
+    Все циклы по ссылкам parent за O(n): каждый узел проходится один раз.
+    """
+    state: Dict[int, int] = {}  # 1 — на текущем пути, 2 — обработан
+    cycles: List[List[int]] = []
+    for start in parents:
+        if start in state:
+            continue
+        path: List[int] = []
+        node: Optional[int] = start
+        while node is not None and node in parents and node not in state:
+            state[node] = 1
+            path.append(node)
+            node = parents[node]
+        if node is not None and state.get(node) == 1:
+            cycles.append(sorted(path[path.index(node):]))
+        for n in path:
+            state[n] = 2
+    return cycles
+
+
+def _duplicate_urls() -> List[Dict]:
+    # Группировка на стороне БД: память не зависит от числа пунктов
+    duplicates: List[Dict] = []
+    by_url = (
+        MenuItem.objects.exclude(url="").filter(named_url="")
+        .values("menu_id", "url").annotate(n=Count("id")).filter(n__gt=1).order_by("menu_id", "url")
+    )
+    for row in by_url:
+        duplicates.append({"menu_id": row["menu_id"], "url": row["url"], "count": row["n"]})
+    by_name = (
+        MenuItem.objects.exclude(named_url="")
+        .values("menu_id", "named_url", "named_args", "named_kwargs").annotate(n=Count("id")).filter(n__gt=1)
+        .order_by("menu_id", "named_url")
+    )
+    for row in by_name:
+        duplicates.append({
+            "menu_id": row["menu_id"],
+            "named_url": row["named_url"],
+            "named_args": row["named_args"],
+            "named_kwargs": row["named_kwargs"],
+            "count": row["n"],
+        })
+    return duplicates
+
+
+def _menus_of(item_ids: List[int], batch_size: int) -> Dict[int, int]:
+    # Меню для id родителей вне своего меню; отсутствующих id в ответе нет
+    found: Dict[int, int] = {}
+    for i in range(0, len(item_ids), batch_size):
+        chunk = item_ids[i:i + batch_size]
+        found.update(MenuItem.objects.filter(id__in=chunk).values_list("id", "menu_id"))
+    return found
+
+
+def check_menus(batch_size: int = DEFAULT_BATCH_SIZE) -> IntegrityReport:
+    """
+    Проверка всех меню батчами за линейное время:
+    родитель из другого меню, ссылка на несуществующего родителя,
+    циклы и дубликаты URL внутри меню.
+    Пункты обрабатываются по одному меню: память ограничена самым большим меню,
+    а не всей таблицей. Цикл через несколько меню сообщается как cross_menu.
+    """
+    report = IntegrityReport()
+    # (id, menu_id, parent_id) пунктов, чей родитель не в их меню — чужой или отсутствует
+    outside: List[Tuple[int, int, int]] = []
+    for menu_id, rows in _iter_menus(batch_size):
+        parents: Dict[int, Optional[int]] = dict(rows)
+        report.checked += len(parents)
+        for item_id, parent_id in rows:
+            if parent_id is not None and parent_id not in parents:
+                outside.append((item_id, menu_id, parent_id))
+                # такая ссылка не может замкнуть цикл внутри меню
+                parents[item_id] = None
+        report.cycles.extend(_find_cycles(parents))
+
+    parent_menus = _menus_of(sorted({parent_id for _, _, parent_id in outside}), batch_size)
+    for item_id, menu_id, parent_id in outside:
+        parent_menu_id = parent_menus.get(parent_id)
+        if parent_menu_id is None:
+            report.orphans.append({"id": item_id, "menu_id": menu_id, "parent_id": parent_id})
+        else:
+            report.cross_menu.append({
+                "id": item_id,
+                "menu_id": menu_id,
+                "parent_id": parent_id,
+                "parent_menu_id": parent_menu_id,
+            })
+
+    report.duplicate_urls = _duplicate_urls()
+    return report
+
+
+def repair_menus(report: IntegrityReport, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Исправляет структурные ошибки из отчёта: пункт с чужим, отсутствующим
+    родителем или первый (минимальный id) пункт цикла становится корневым.
+    Дубликаты URL только сообщаются — выбрать «правильный» пункт может лишь редактор.
+    """
+    to_detach = {
+        "cross_menu": [row["id"] for row in report.cross_menu],
+        "orphans": [row["id"] for row in report.orphans],
+        "cycles": [cycle[0] for cycle in report.cycles],
+    }
+    repaired: Dict[str, int] = {}
+    menu_ids = set()
+    with transaction.atomic():
+        for kind, ids in to_detach.items():
+            repaired[kind] = 0
+            for i in range(0, len(ids), batch_size):
+                chunk = ids[i:i + batch_size]
+                menu_ids.update(MenuItem.objects.filter(id__in=chunk).values_list("menu_id", flat=True))
+                repaired[kind] += MenuItem.objects.filter(id__in=chunk).update(parent=None)
+
+    # QuerySet.update() не отправляет сигналы — сбрасываем кэш затронутых меню явно
+    for slug in Menu.objects.filter(id__in=menu_ids).values_list("slug", flat=True):
+        menu_cache.invalidate(slug)
+
+    report.repaired = repaired
+    return repaired
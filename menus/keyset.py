@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, PAGE_VAR, ChangeList
+from django.db import connections
+from django.db.models import Q
+
+# Параметр changelist: id последней строки предыдущей страницы
+CURSOR_VAR = "after"
+
+
+def keyset_segments(fields: Sequence[str], values: Sequence[Any], nulls_largest: bool) -> List[Q]:
+    """
+    Условие «строка строго после курсора» в порядке fields (все ASC) как список
+    непересекающихся сегментов, каждый — равенства по префиксу + одно неравенство.
+    Сегменты идут в порядке сортировки, поэтому их результаты можно просто
+    склеивать; каждый — диапазон одного индекса по fields, без OFFSET.
+    NULL (родитель у корней) упорядочивается как в БД: nulls_largest из features.
+    """
+    segments: List[Q] = []
+    for k in range(len(fields) - 1, -1, -1):
+        prefix = Q()
+        for name, value in zip(fields[:k], values[:k]):
+            prefix &= Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+        name, value = fields[k], values[k]
+        if value is None:
+            after = [] if nulls_largest else [Q(**{f"{name}__isnull": False})]
+        else:
+            after = [Q(**{f"{name}__gt": value})]
+            if nulls_largest:
+                after.append(Q(**{f"{name}__isnull": True}))
+        segments.extend(prefix & cond for cond in after)
+    return segments
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist без COUNT(*) и OFFSET: при сортировке по умолчанию страница
+    выбирается по курсору ?after=<id> через индекс model_admin.keyset_fields
+    (первичные ключи — index-only), затем одна выборка строк по pk.
+    Пользовательская сортировка (?o=) и «показать все» — обычная пагинация.
+    """
+
+    keyset = False
+    next_url: Optional[str] = None
+    first_url: Optional[str] = None
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def _keyset_enabled(self, request) -> bool:
+        return ORDER_VAR not in request.GET and ALL_VAR not in request.GET
+
+    def get_results(self, request):
+        if not self._keyset_enabled(request):
+            return super().get_results(request)
+
+        fields = list(self.model_admin.keyset_fields)
+        per_page = self.list_per_page
+        limit = per_page + 1
+        keys = self.queryset.values_list("pk", flat=True)
+        cursor = request.GET.get(CURSOR_VAR)
+        if cursor:
+            values = self.root_queryset.filter(pk=cursor).values_list(*fields).first() if cursor.isdigit() else None
+            if values is None:
+                raise IncorrectLookupParameters
+            nulls_largest = connections[self.queryset.db].features.nulls_order_largest
+            ids: List[Any] = []
+            for segment in keyset_segments(fields, values, nulls_largest):
+                ids += keys.filter(segment)[: limit - len(ids)]
+                if len(ids) >= limit:
+                    break
+        else:
+            ids = list(keys[:limit])
+
+        has_next = len(ids) > per_page
+        ids = ids[:per_page]
+
+        self.keyset = True
+        self.result_list = self.queryset.filter(pk__in=ids)
+        self.result_count = len(ids)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = has_next or bool(cursor)
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, per_page)
+        self.next_url = self.get_query_string({CURSOR_VAR: ids[-1]}, [PAGE_VAR]) if has_next else None
+        self.first_url = self.get_query_string(remove=[CURSOR_VAR, PAGE_VAR]) if cursor else None
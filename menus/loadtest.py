@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import asyncio
+import http.client
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+# Заголовок ответа, в котором обёртка приложения сообщает число SQL-запросов
+QUERIES_HEADER = "X-Menus-Queries"
+
+# (метка эндпоинта, путь)
+Request = Tuple[str, str]
+
+_queries: ContextVar[Optional[List[int]]] = ContextVar("menus_loadtest_queries", default=None)
+
+
+# ----------------------- ПОДСЧЁТ ЗАПРОСОВ -----------------------
+
+def _count_query(execute, sql, params, many, context):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class query_counting:
+    """
+    Считает SQL-запросы каждого запроса к приложению в любых потоках:
+    execute_wrapper ставится на каждое соединение, счётчик — в ContextVar,
+    который asgiref переносит и в потоки sync_to_async.
+    """
+
+    def __enter__(self):
+        connection_created.connect(_install_counter, dispatch_uid="menus_loadtest_queries")
+        for conn in connections.all(initialized_only=True):
+            _install_counter(None, conn)
+        return self
+
+    def __exit__(self, *exc):
+        connection_created.disconnect(dispatch_uid="menus_loadtest_queries")
+        for conn in connections.all(initialized_only=True):
+            if _count_query in conn.execute_wrappers:
+                conn.execute_wrappers.remove(_count_query)
+
+
+def counting_wsgi(app):
+    def wrapped(environ, start_response):
+        counter = [0]
+        token = _queries.set(counter)
+        try:
+            def start(status, headers, exc_info=None):
+                # Django вызывает start_response после view — счётчик уже полный
+                return start_response(status, [*headers, (QUERIES_HEADER, str(counter[0]))], exc_info)
+
+            return app(environ, start)
+        finally:
+            _queries.reset(token)
+
+    return wrapped
+
+
+def counting_asgi(app):
+    async def wrapped(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        counter = [0]
+        token = _queries.set(counter)
+
+        async def counted_send(message):
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", ()), (QUERIES_HEADER.lower().encode(), str(counter[0]).encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await app(scope, receive, counted_send)
+        finally:
+            _queries.reset(token)
+
+    return wrapped
+
+
+# ----------------------- СЕРВЕРЫ -----------------------
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGIServerThread:
+    """Проектное WSGI-приложение (settings.WSGI_APPLICATION) на ThreadedWSGIServer."""
+
+    def __init__(self, app) -> None:
+        self.server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietHandler, allow_reuse_address=False)
+        self.server.set_app(app)
+        self.address = self.server.server_address[:2]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self._thread.join()
+
+
+class ASGIServerThread:
+    """
+    Минимальный HTTP/1.1-сервер на asyncio для ASGI-приложения (без
+    сторонних зависимостей): keep-alive, тело ответа отдаётся с Content-Length.
+    Цикл событий работает в отдельном потоке.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.address = self.server.sockets[0].getsockname()[:2]
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        async def close():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    async def _respond(self, scope, body: bytes) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        status, headers, chunks = 500, [], []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Django ждёт http.disconnect параллельно с view и отменяет её при
+            # разрыве — клиент не отключается, пока ответ не отправлен
+            await asyncio.Future()
+
+        async def send(message):
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status, headers = message["status"], list(message.get("headers", ()))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, headers, b"".join(chunks)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+                method, target, _ = head[0].split(" ", 2)
+                headers = []
+                for line in head[1:]:
+                    if line:
+                        name, _, value = line.partition(":")
+                        headers.append((name.strip().lower().encode("latin-1"), value.strip().encode("latin-1")))
+                request_headers = dict(headers)
+                length = int(request_headers.get(b"content-length", b"0"))
+                body = await reader.readexactly(length) if length else b""
+                path, _, query = target.partition("?")
+                scope = {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": method,
+                    "scheme": "http",
+                    "path": unquote(path),
+                    "raw_path": path.encode("latin-1"),
+                    "query_string": query.encode("latin-1"),
+                    "root_path": "",
+                    "headers": headers,
+                    "client": writer.get_extra_info("peername")[:2],
+                    "server": self.address,
+                }
+                status, response_headers, content = await self._respond(scope, body)
+                lines = [f"HTTP/1.1 {status} {http.client.responses.get(status, '')}"]
+                for name, value in response_headers:
+                    if name.lower() not in (b"content-length", b"transfer-encoding"):
+                        lines.append(f"{name.decode('latin-1')}: {value.decode('latin-1')}")
+                lines.append(f"Content-Length: {len(content)}")
+                writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + content)
+                await writer.drain()
+                if request_headers.get(b"connection", b"").lower() == b"close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def start_server(kind: str):
+    """Поднимает проектное приложение ("wsgi" или "asgi") на свободном порту."""
+    if kind == "wsgi":
+        server = WSGIServerThread(counting_wsgi(import_string(settings.WSGI_APPLICATION)))
+    else:
+        app_path = getattr(settings, "ASGI_APPLICATION", None) or "config.asgi.application"
+        server = ASGIServerThread(counting_asgi(import_string(app_path)))
+    server.start()
+    return server
+
+
+# ----------------------- КЛИЕНТЫ -----------------------
+
+@dataclass
+class Sample:
+    label: str
+    status: int
+    seconds: float
+    queries: int
+
+
+def _split(plan: Sequence[Request], workers: int) -> List[Sequence[Request]]:
+    return [plan[i::workers] for i in range(workers) if plan[i::workers]]
+
+
+def run_threads(address, host: str, headers: Dict[str, str], plan: Sequence[Request], concurrency: int) -> List[Sample]:
+    """Пул потоков: у каждого своё keep-alive соединение и своя доля плана."""
+
+    def worker(part: Sequence[Request]) -> List[Sample]:
+        samples: List[Sample] = []
+        conn = http.client.HTTPConnection(*address, timeout=30)
+        try:
+            for label, path in part:
+                started = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers={"Host": host, **headers})
+                    response = conn.getresponse()
+                    response.read()
+                    status, queries = response.status, int(response.getheader(QUERIES_HEADER, 0))
+                    if response.will_close:
+                        conn.close()
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    status, queries = 0, 0
+                samples.append(Sample(label, status, time.perf_counter() - started, queries))
+        finally:
+            conn.close()
+        return samples
+
+    parts = _split(plan, concurrency)
+    with ThreadPoolExecutor(max_workers=len(parts) or 1) as pool:
+        return [s for samples in pool.map(worker, parts) for s in samples]
+
+
+async def _async_get(state: dict, address, raw_request: bytes) -> Tuple[int, int]:
+    if state.get("writer") is None:
+        state["reader"], state["writer"] = await asyncio.open_connection(*address)
+    reader, writer = state["reader"], state["writer"]
+    writer.write(raw_request)
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split(" ", 2)[1])
+    response_headers = {}
+    for line in head[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+    if "content-length" in response_headers:
+        await reader.readexactly(int(response_headers["content-length"]))
+    else:
+        await reader.read()
+        response_headers["connection"] = "close"
+    if response_headers.get("connection", "").lower() == "close":
+        writer.close()
+        state["writer"] = None
+    return status, int(response_headers.get(QUERIES_HEADER.lower(), 0))
+
+
+def run_asyncio(address, host: str, headers: Dict[str, str], plan: Sequence[Request], concurrency: int) -> List[Sample]:
+    """asyncio-клиенты: concurrency корутин с keep-alive соединениями в одном цикле событий."""
+    extra = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+
+    async def worker(part: Sequence[Request]) -> List[Sample]:
+        samples: List[Sample] = []
+        state: dict = {}
+        for label, path in part:
+            raw = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{extra}\r\n".encode("latin-1")
+            started = time.perf_counter()
+            try:
+                status, queries = await _async_get(state, address, raw)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                if state.get("writer") is not None:
+                    state["writer"].close()
+                state["writer"] = None
+                status, queries = 0, 0
+            samples.append(Sample(label, status, time.perf_counter() - started, queries))
+        if state.get("writer") is not None:
+            state["writer"].close()
+        return samples
+
+    async def main() -> List[Sample]:
+        results = await asyncio.gather(*(worker(part) for part in _split(plan, concurrency)))
+        return [s for samples in results for s in samples]
+
+    return asyncio.run(main())
+
+
+CLIENTS: Dict[str, Callable[..., List[Sample]]] = {"threads": run_threads, "asyncio": run_asyncio}
+
+
+# ----------------------- ПЛАН И ОТЧЁТ -----------------------
+
+def build_plan(pools: Dict[str, List[str]], weights: Dict[str, int], total: int, seed: Optional[int] = None) -> List[Request]:
+    """Случайная последовательность запросов с заданными весами групп эндпоинтов."""
+    rnd = random.Random(seed)
+    labels = [label for label in weights if weights[label] > 0 and pools.get(label)]
+    if not labels:
+        return []
+    chosen = rnd.choices(labels, weights=[weights[label] for label in labels], k=total)
+    return [(label, rnd.choice(pools[label])) for label in chosen]
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу; q в долях (0.99)."""
+    if not sorted_values:
+        return 0.0
+    rank = min(max(math.ceil(q * len(sorted_values)), 1), len(sorted_values))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class EndpointStats:
+    label: str
+    requests: int = 0
+    errors: int = 0
+    rps: float = 0.0
+    p50_ms: float = 0.0
+    p90_ms: float = 0.0
+    p99_ms: float = 0.0
+    max_ms: float = 0.0
+    queries_per_request: float = 0.0
+    statuses: Dict[int, int] = field(default_factory=dict)
+
+
+def summarize(samples: Sequence[Sample], elapsed: float) -> List[EndpointStats]:
+    """Статистика по группам эндпоинтов и итоговая строка "total"."""
+    by_label: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_label.setdefault(sample.label, []).append(sample)
+    groups = {label: by_label[label] for label in sorted(by_label)}
+    groups["total"] = list(samples)
+
+    report: List[EndpointStats] = []
+    for label, group in groups.items():
+        timings = sorted(s.seconds for s in group)
+        stats = EndpointStats(label=label, requests=len(group))
+        stats.errors = sum(1 for s in group if not 200 <= s.status < 400)
+        stats.rps = len(group) / elapsed if elapsed else 0.0
+        stats.p50_ms = percentile(timings, 0.50) * 1000
+        stats.p90_ms = percentile(timings, 0.90) * 1000
+        stats.p99_ms = percentile(timings, 0.99) * 1000
+        stats.max_ms = (timings[-1] if timings else 0.0) * 1000
+        stats.queries_per_request = sum(s.queries for s in group) / len(group) if group else 0.0
+        for s in group:
+            stats.statuses[s.status] = stats.statuses.get(s.status, 0) + 1
+        report.append(stats)
+    return report
@@ -0,0 +1,78 @@
+# file: menus/management/commands/benchmark_menu_loading.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from menus.branch import load_branch, supports_branch_loading
+from menus.cache import load_items
+from menus.compiled import compile_menu
+from menus.models import Menu, MenuItem
+from menus.templatetags.menu_tags import _build_tree, _mark_active_and_expand
+
+BENCH_SLUG = "bench_menu"
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает загрузку меню: полная (select_related) и только видимая ветка (recursive CTE). "
+        "Синтетическое меню создаётся в транзакции и откатывается."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fanout", type=int, default=10, help="Детей у каждого узла")
+        parser.add_argument("--depth", type=int, default=4, help="Глубина дерева")
+        parser.add_argument("--repeat", type=int, default=20, help="Повторов на стратегию")
+
+    def _create_menu(self, fanout: int, depth: int) -> str:
+        menu = Menu.objects.create(title="Benchmark", slug=BENCH_SLUG)
+        level = [None]
+        deepest_url = "/"
+        for d in range(depth):
+            batch = []
+            for parent in level:
+                prefix = parent.url if parent else "/bench/"
+                for i in range(fanout):
+                    batch.append(MenuItem(menu=menu, parent=parent, title=f"{d}-{i}", url=f"{prefix}{i}/", order=i))
+            level = MenuItem.objects.bulk_create(batch)
+            deepest_url = level[len(level) // 2].url
+        return deepest_url
+
+    def _measure(self, label: str, repeat: int, load, path: str) -> None:
+        timings = []
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                items = load()
+                menu = compile_menu(BENCH_SLUG, items)
+                active_id, ancestors, expanded = _mark_active_and_expand(menu, path, path)
+                _build_tree(menu, active_id, ancestors, expanded)
+                timings.append(time.perf_counter() - started)
+        timings.sort()
+        self.stdout.write(
+            f"{label:<8} items={len(items):>8}  queries/render={len(ctx) / repeat:.1f}  "
+            f"median={timings[len(timings) // 2] * 1000:.2f} ms  p95={timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms"
+        )
+
+    def handle(self, *args, **options):
+        if Menu.objects.filter(slug=BENCH_SLUG).exists():
+            raise CommandError(f"Меню '{BENCH_SLUG}' уже существует")
+        try:
+            with transaction.atomic():
+                path = self._create_menu(options["fanout"], options["depth"])
+                total = MenuItem.objects.filter(menu__slug=BENCH_SLUG).count()
+                self.stdout.write(f"menu items={total}  active path={path}")
+                reset_queries()
+                self._measure("full", options["repeat"], lambda: load_items([BENCH_SLUG])[BENCH_SLUG], path)
+                if supports_branch_loading():
+                    self._measure("branch", options["repeat"], lambda: load_branch(BENCH_SLUG, path, path), path)
+                else:
+                    self.stdout.write(f"branch   не поддерживается бэкендом {connection.vendor}")
+                raise _Rollback
+        except _Rollback:
+            pass
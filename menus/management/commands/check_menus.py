@@ -0,0 +1,24 @@
+# file: menus/management/commands/check_menus.py
+import json
+
+from django.core.management.base import BaseCommand
+
+from menus.integrity import DEFAULT_BATCH_SIZE, check_menus, repair_menus
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет целостность всех меню (родитель из другого меню, отсутствующий родитель, "
+        "циклы, дубликаты URL) и выводит отчёт в JSON. С --repair исправляет структурные ошибки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repair", action="store_true", help="Сделать проблемные пункты корневыми")
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Размер батча чтения")
+        parser.add_argument("--indent", type=int, default=None, help="Отступ JSON")
+
+    def handle(self, *args, **options):
+        report = check_menus(batch_size=options["batch_size"])
+        if options["repair"] and not report.ok:
+            repair_menus(report, batch_size=options["batch_size"])
+        self.stdout.write(json.dumps(report.as_dict(), ensure_ascii=False, indent=options["indent"]))
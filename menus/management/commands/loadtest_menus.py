@@ -0,0 +1,146 @@
+# file: menus/management/commands/loadtest_menus.py
+import json
+import time
+from dataclasses import asdict
+from importlib import import_module
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from menus.cache import compile_many
+from menus.loadtest import CLIENTS, build_plan, query_counting, start_server, summarize
+from menus.models import Menu, MenuItem
+
+DEFAULT_MIX = "home=2,catalog=6,admin=1"
+
+
+def _parse_mix(raw: str) -> Dict[str, int]:
+    weights: Dict[str, int] = {}
+    for part in raw.split(","):
+        label, _, weight = part.partition("=")
+        if label.strip() not in ("home", "catalog", "admin") or not weight.strip().isdigit():
+            raise CommandError(f"Неверный --mix: '{part}' (ожидается home=N,catalog=N,admin=N)")
+        weights[label.strip()] = int(weight)
+    return weights
+
+
+def _default_host() -> str:
+    # Host должен пройти ALLOWED_HOSTS, иначе все ответы будут 400
+    for host in settings.ALLOWED_HOSTS:
+        if host == "*":
+            return "localhost"
+        return host.lstrip(".")
+    return "localhost"
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест страниц с меню на одной машине: проектные WSGI (settings.WSGI_APPLICATION) "
+        "и ASGI (config.asgi) приложения поднимаются в процессе на локальном порту, пул клиентов "
+        "(потоки или asyncio) запрашивает /, /catalog/... и админку. Отчёт по группам: RPS, "
+        "перцентили задержки, SQL-запросов на запрос. Импорт config.wsgi, как и при старте сервера, "
+        "создаёт схему и демо-меню в пустой базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", choices=["wsgi", "asgi", "both"], default="both")
+        parser.add_argument("--client", choices=sorted(CLIENTS), default="threads", help="Пул клиентов")
+        parser.add_argument("--concurrency", type=int, default=8, help="Одновременных клиентов")
+        parser.add_argument("--requests", type=int, default=1000, help="Запросов на сервер")
+        parser.add_argument("--warmup", type=int, default=50, help="Прогревочных запросов (не учитываются)")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Веса групп эндпоинтов, по умолчанию {DEFAULT_MIX}")
+        parser.add_argument("--admin-user", help="Staff-пользователь для страниц админки (иначе только /admin/login/)")
+        parser.add_argument("--host", default=None, help="Заголовок Host (по умолчанию из ALLOWED_HOSTS)")
+        parser.add_argument("--seed", type=int, default=None, help="Seed для воспроизводимой смеси путей")
+        parser.add_argument("--json", action="store_true", help="Отчёт в JSON")
+
+    def _catalog_paths(self) -> List[str]:
+        slugs = list(Menu.objects.values_list("slug", flat=True))
+        urls = {url for menu in compile_many(slugs).values() for url in menu.urls.values()}
+        return sorted({"/catalog/", *(u for u in urls if u.startswith("/catalog/"))})
+
+    def _admin_paths(self, logged_in: bool) -> List[str]:
+        if not logged_in:
+            return ["/admin/login/"]
+        paths = ["/admin/", "/admin/menus/menu/", "/admin/menus/menuitem/", "/admin/menus/menuitem/?q=a"]
+        for item_id in MenuItem.objects.order_by("id").values_list("id", flat=True)[:5]:
+            paths.append(f"/admin/menus/menuitem/{item_id}/change/")
+        return paths
+
+    def _login(self, username: Optional[str]):
+        if not username:
+            return None
+        user = get_user_model()._default_manager.filter(**{get_user_model().USERNAME_FIELD: username}).first()
+        if user is None or not user.is_staff:
+            raise CommandError(f"Staff-пользователь '{username}' не найден")
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    def handle(self, *args, **options):
+        weights = _parse_mix(options["mix"])
+        concurrency = max(1, options["concurrency"])
+        host = options["host"] or _default_host()
+        servers = ["wsgi", "asgi"] if options["server"] == "both" else [options["server"]]
+        run_client = CLIENTS[options["client"]]
+
+        if settings.DEBUG:
+            self.stderr.write("DEBUG=True: debug_toolbar и отладочные проверки искажают результаты")
+
+        session = self._login(options["admin_user"])
+        headers = {"Cookie": f"{settings.SESSION_COOKIE_NAME}={session.session_key}"} if session else {}
+        pools = {
+            "home": ["/"],
+            "catalog": self._catalog_paths(),
+            "admin": self._admin_paths(session is not None),
+        }
+        plan = build_plan(pools, weights, options["requests"], options["seed"])
+        if not plan:
+            raise CommandError("Пустой план запросов: проверьте --mix и --requests")
+
+        results = []
+        try:
+            with query_counting():
+                for kind in servers:
+                    server = start_server(kind)
+                    try:
+                        if options["warmup"]:
+                            run_client(server.address, host, headers, plan[: options["warmup"]], concurrency)
+                        started = time.perf_counter()
+                        samples = run_client(server.address, host, headers, plan, concurrency)
+                        elapsed = time.perf_counter() - started
+                    finally:
+                        server.stop()
+                    results.append({
+                        "server": kind,
+                        "client": options["client"],
+                        "concurrency": concurrency,
+                        "seconds": round(elapsed, 3),
+                        "endpoints": [asdict(stats) for stats in summarize(samples, elapsed)],
+                    })
+        finally:
+            if session is not None:
+                session.delete()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f"{result['server']} / {result['client']} x{result['concurrency']}: {result['seconds']:.2f} s"
+            )
+            self.stdout.write(
+                f"  {'endpoint':<10}{'requests':>9}{'errors':>8}{'rps':>9}"
+                f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'queries':>9}"
+            )
+            for stats in result["endpoints"]:
+                self.stdout.write(
+                    f"  {stats['label']:<10}{stats['requests']:>9}{stats['errors']:>8}{stats['rps']:>9.1f}"
+                    f"{stats['p50_ms']:>9.2f}{stats['p90_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+                    f"{stats['max_ms']:>9.2f}{stats['queries_per_request']:>9.2f}"
+                )
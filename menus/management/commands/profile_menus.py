@@ -0,0 +1,108 @@
+# file: menus/management/commands/profile_menus.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.template import RequestContext, Template
+from django.test import RequestFactory
+
+from menus.cache import cache_enabled, menu_cache
+from menus.models import Menu, MenuItem
+from menus.profiling import profiling
+
+PROFILE_SLUG = "profile_menu"
+_TEMPLATE = Template("{% load menu_tags %}{% menu_prefetch slug %}{% draw_menu slug %}")
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Профиль рендера меню по размерам: tracemalloc и cProfile вокруг menu_prefetch, "
+        "_mark_active_and_expand, _build_tree и рендера draw_menu.html. Для каждого размера — "
+        "время и пик памяти этапов, оставшиеся байты/блоки на пункт и горячие функции. "
+        "Синтетические меню создаются в транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="100,1000,10000", help="Размеры меню через запятую")
+        parser.add_argument("--fanout", type=int, default=10, help="Детей у каждого узла")
+        parser.add_argument("--top", type=int, default=10, help="Сколько горячих функций показать")
+        parser.add_argument("--json", action="store_true", help="Отчёт в JSON")
+
+    def _create_menu(self, size: int, fanout: int) -> str:
+        """Дерево из size пунктов в ширину; возвращает URL самого глубокого пункта."""
+        menu = Menu.objects.create(title="Profile", slug=PROFILE_SLUG)
+        level = [None]
+        created = 0
+        deepest_url = "/"
+        while created < size and level:
+            batch = []
+            for parent in level:
+                prefix = parent.url if parent else "/profile/"
+                for i in range(min(fanout, size - created - len(batch))):
+                    batch.append(MenuItem(menu=menu, parent=parent, title=f"Item {created + len(batch)}", url=f"{prefix}{i}/", order=i))
+            level = MenuItem.objects.bulk_create(batch)
+            created += len(level)
+            if level:
+                deepest_url = level[len(level) // 2].url
+        return deepest_url
+
+    @staticmethod
+    def _forget_menu() -> None:
+        # Откат транзакции не публикует новую версию меню: сбрасываем его явно,
+        # иначе следующий размер профилировал бы дерево предыдущего
+        if cache_enabled():
+            menu_cache.invalidate(PROFILE_SLUG)
+
+    def _profile(self, size: int, fanout: int, top: int) -> dict:
+        path = self._create_menu(size, fanout)
+        request = RequestFactory().get(path)
+        # прогрев: импорт, компиляция шаблонов, кэш reverse()
+        _TEMPLATE.render(RequestContext(request, {"slug": PROFILE_SLUG}))
+        # прогрев положил меню в кэш процесса — без сброса загрузка не попала бы в профиль
+        self._forget_menu()
+        with profiling() as profile:
+            _TEMPLATE.render(RequestContext(request, {"slug": PROFILE_SLUG}))
+        return {"size": size, "path": path, **profile.as_dict(limit=top)}
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes: ожидаются целые числа через запятую")
+        if Menu.objects.filter(slug=PROFILE_SLUG).exists():
+            raise CommandError(f"Меню '{PROFILE_SLUG}' уже существует")
+
+        reports = []
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    reports.append(self._profile(size, options["fanout"], options["top"]))
+                    raise _Rollback
+            except _Rollback:
+                pass
+            finally:
+                self._forget_menu()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(reports, ensure_ascii=False, indent=2))
+            return
+        for report in reports:
+            self.stdout.write(f"menu items={report['size']}  active path={report['path']}")
+            self.stdout.write(
+                f"  {'stage':<26}{'ms':>9}{'peak KB':>10}{'kept KB':>10}{'blocks':>9}{'B/item':>9}{'blk/item':>9}"
+            )
+            for stats in report["stages"]:
+                self.stdout.write(
+                    f"  {stats['name']:<26}{stats['seconds'] * 1000:>9.2f}{stats['peak_bytes'] / 1024:>10.1f}"
+                    f"{stats['retained_bytes'] / 1024:>10.1f}{stats['retained_blocks']:>9}"
+                    f"{stats['bytes_per_item']:>9.1f}{stats['blocks_per_item']:>9.2f}"
+                )
+            self.stdout.write(f"  {'hot function':<60}{'calls':>9}{'tottime':>10}{'cumtime':>10}")
+            for row in report["hot_functions"]:
+                self.stdout.write(
+                    f"  {row['function'][-60:]:<60}{row['calls']:>9}{row['tottime']:>10.4f}{row['cumtime']:>10.4f}"
+                )
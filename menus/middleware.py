@@ -0,0 +1,70 @@
+import json
+import logging
+
+from django.conf import settings
+
+from menus.profiling import profiling
+from menus.routers import request_scope
+
+PIN_COOKIE = "menus_primary"
+PROFILE_PARAM = "menus_profile"
+
+logger = logging.getLogger("menus.profiling")
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes для редактора: после небезопасного метода (POST и т.п.)
+    или любой записи в БД ставится cookie, и в течение MENUS_REPLICA_PIN_SECONDS
+    запросы этой сессии читают меню с primary, а не с отстающей реплики.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        unsafe = request.method not in ("GET", "HEAD", "OPTIONS")
+        with request_scope(pinned=unsafe or PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        if unsafe or state["wrote"]:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "MENUS_REPLICA_PIN_SECONDS", 10),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class MenuProfilingMiddleware:
+    """
+    Профиль рендера меню по запросу: ?menus_profile=1 (при DEBUG или для staff).
+    Этапы menu_prefetch/load/_mark_active_and_expand/_build_tree/render меряются
+    tracemalloc и cProfile; длительности — в заголовке Server-Timing, полный
+    отчёт (память, блоки на пункт, горячие функции) — в логгер menus.profiling.
+    Подключается вручную после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _allowed(self, request) -> bool:
+        if PROFILE_PARAM not in request.GET:
+            return False
+        user = getattr(request, "user", None)
+        return settings.DEBUG or bool(user is not None and user.is_staff)
+
+    def __call__(self, request):
+        if not self._allowed(request):
+            return self.get_response(request)
+        memory = request.GET.get(PROFILE_PARAM) != "time"
+        with profiling(memory=memory) as profile:
+            response = self.get_response(request)
+            # шаблонный ответ рендерится лениво — рендер меню должен попасть в профиль
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        if profile.stages:
+            response.headers["Server-Timing"] = profile.server_timing()
+            logger.info("%s %s", request.get_full_path(), json.dumps(profile.as_dict(), ensure_ascii=False))
+        return response
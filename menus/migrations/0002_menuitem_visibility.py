@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('menus', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='groups',
+            field=models.ManyToManyField(blank=True, related_name='+', to='auth.group', verbose_name='Группы'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='permissions',
+            field=models.ManyToManyField(blank=True, related_name='+', to='auth.permission', verbose_name='Права'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='visibility',
+            field=models.CharField(choices=[('public', 'Всем'), ('authenticated', 'Авторизованным'), ('restricted', 'Группам / правам')], default='public', max_length=16, verbose_name='Видимость'),
+        ),
+    ]
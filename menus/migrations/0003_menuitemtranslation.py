@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menus', '0002_menuitem_visibility'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemTranslation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(max_length=15, verbose_name='Язык')),
+                ('title', models.CharField(blank=True, max_length=255, verbose_name='Заголовок')),
+                ('url', models.CharField(blank=True, max_length=255, verbose_name='URL')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='translations', to='menus.menuitem', verbose_name='Пункт')),
+            ],
+            options={
+                'verbose_name': 'Перевод пункта меню',
+                'verbose_name_plural': 'Переводы пунктов меню',
+                'constraints': [models.UniqueConstraint(fields=('item', 'language'), name='menus_item_translation_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:19
+
+from django.db import DatabaseError, migrations, models, transaction
+
+# Поиск админки по title/url/named_url (см. menus/search.py):
+#   - PostgreSQL: GIN-индексы pg_trgm по UPPER(поле) — их использует icontains;
+#   - SQLite: внешняя FTS5-таблица с токенизатором trigram и триггеры синхронизации.
+# Если расширение/модуль недоступны, индексы не создаются и админка ищет обычным icontains.
+SEARCH_FIELDS = ("title", "url", "named_url")
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE menus_menuitem_search USING fts5("
+    "title, url, named_url, content='menus_menuitem', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER menus_menuitem_search_ai AFTER INSERT ON menus_menuitem BEGIN "
+    "INSERT INTO menus_menuitem_search(rowid, title, url, named_url) "
+    "VALUES (new.id, new.title, new.url, new.named_url); END",
+    "CREATE TRIGGER menus_menuitem_search_ad AFTER DELETE ON menus_menuitem BEGIN "
+    "INSERT INTO menus_menuitem_search(menus_menuitem_search, rowid, title, url, named_url) "
+    "VALUES ('delete', old.id, old.title, old.url, old.named_url); END",
+    "CREATE TRIGGER menus_menuitem_search_au AFTER UPDATE OF title, url, named_url ON menus_menuitem BEGIN "
+    "INSERT INTO menus_menuitem_search(menus_menuitem_search, rowid, title, url, named_url) "
+    "VALUES ('delete', old.id, old.title, old.url, old.named_url); "
+    "INSERT INTO menus_menuitem_search(rowid, title, url, named_url) "
+    "VALUES (new.id, new.title, new.url, new.named_url); END",
+    "INSERT INTO menus_menuitem_search(menus_menuitem_search) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS menus_menuitem_search_ai",
+    "DROP TRIGGER IF EXISTS menus_menuitem_search_ad",
+    "DROP TRIGGER IF EXISTS menus_menuitem_search_au",
+    "DROP TABLE IF EXISTS menus_menuitem_search",
+]
+
+
+def _execute(schema_editor, statements):
+    connection = schema_editor.connection
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+    except DatabaseError:
+        # нет pg_trgm (или прав на CREATE EXTENSION) / SQLite собран без FTS5
+        pass
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _execute(schema_editor, ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+            f'CREATE INDEX IF NOT EXISTS menus_item_{name}_trgm ON menus_menuitem '
+            f'USING gin (UPPER("{name}"::text) gin_trgm_ops)'
+            for name in SEARCH_FIELDS
+        ])
+    elif vendor == "sqlite":
+        _execute(schema_editor, SQLITE_CREATE)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _execute(schema_editor, [f"DROP INDEX IF EXISTS menus_item_{name}_trgm" for name in SEARCH_FIELDS])
+    elif vendor == "sqlite":
+        _execute(schema_editor, SQLITE_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('menus', '0003_menuitemtranslation'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='menuitem',
+            name='menus_menui_menu_id_5ea954_idx',
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['menu', 'parent', 'order', 'id'], name='menus_item_admin_order'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -42,11 +42,26 @@ class MenuItem(models.Model):
     # Поле сортировки в пределах одного уровня
     order = models.PositiveIntegerField(default=0, verbose_name="Порядок")
 
+    class Visibility(models.TextChoices):
+        PUBLIC = "public", "Всем"
+        AUTHENTICATED = "authenticated", "Авторизованным"
+        # Членам любой из groups или владельцам любого из permissions
+        RESTRICTED = "restricted", "Группам / правам"
+
+    visibility = models.CharField(
+        max_length=16, choices=Visibility.choices, default=Visibility.PUBLIC, verbose_name="Видимость"
+    )
+    groups = models.ManyToManyField("auth.Group", blank=True, related_name="+", verbose_name="Группы")
+    permissions = models.ManyToManyField("auth.Permission", blank=True, related_name="+", verbose_name="Права")
+
     class Meta:
         verbose_name = "Пункт меню"
         verbose_name_plural = "Пункты меню"
         ordering = ["order", "id"]
-        indexes = [models.Index(fields=["menu", "parent"])]
+        indexes = [
+            # покрывает сортировку changelist админки и выборку дерева меню
+            models.Index(fields=["menu", "parent", "order", "id"], name="menus_item_admin_order"),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -73,11 +88,40 @@ class MenuItem(models.Model):
         2) иначе берём явный url;
         3) при любой ошибке — фолбэк '#'.
         """
+        return self.resolve_url(self.url)
+
+    def resolve_url(self, url: str) -> str:
+        """
+        То же, что resolved_url, но с явным URL из перевода (MenuItemTranslation).
+        reverse() зависит от активного языка — вызывающий код переключает его сам.
+        """
         if self.named_url:
             args = self._json_or_default(self.named_args, [])
             kwargs = self._json_or_default(self.named_kwargs, {})
             try:
                 return reverse(self.named_url, args=args, kwargs=kwargs)
             except NoReverseMatch:
-                return self.url or "#"
-        return self.url or "#"
+                return url or "#"
+        return url or "#"
+
+
+class MenuItemTranslation(models.Model):
+    """
+    Заголовок и явный URL пункта на конкретном языке. Пустое поле —
+    берётся значение из MenuItem. Грузится тем же запросом, что и пункты.
+    """
+    item = models.ForeignKey("MenuItem", on_delete=models.CASCADE, related_name="translations", verbose_name="Пункт")
+    # Код из settings.LANGUAGES (как после get_supported_language_variant)
+    language = models.CharField(max_length=15, verbose_name="Язык")
+    title = models.CharField(max_length=255, blank=True, verbose_name="Заголовок")
+    url = models.CharField(max_length=255, blank=True, verbose_name="URL")
+
+    class Meta:
+        verbose_name = "Перевод пункта меню"
+        verbose_name_plural = "Переводы пунктов меню"
+        constraints = [
+            models.UniqueConstraint(fields=["item", "language"], name="menus_item_translation_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.item_id} [{self.language}]"
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import cProfile
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+_active: ContextVar[Optional["RenderProfile"]] = ContextVar("menus_render_profile", default=None)
+
+# Кадры самого tracemalloc и этого модуля в отчёт не попадают
+_TRACE_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+
+@dataclass
+class StageStats:
+    """
+    Итог по одному этапу (суммарно по всем вызовам за рендер).
+    peak_bytes — пик прироста памяти внутри этапа; retained_* — что осталось
+    живым после этапа (блоки по tracemalloc), т.е. стоимость Node/структур на пункт.
+    """
+    name: str
+    calls: int = 0
+    items: int = 0
+    seconds: float = 0.0
+    peak_bytes: int = 0
+    retained_bytes: int = 0
+    retained_blocks: int = 0
+
+    @property
+    def bytes_per_item(self) -> float:
+        return self.retained_bytes / self.items if self.items else 0.0
+
+    @property
+    def blocks_per_item(self) -> float:
+        return self.retained_blocks / self.items if self.items else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "bytes_per_item": self.bytes_per_item, "blocks_per_item": self.blocks_per_item}
+
+
+def _short_path(filename: str) -> str:
+    # site-packages/django/... и пути проекта без общего префикса
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    try:
+        return os.path.relpath(filename)
+    except ValueError:
+        return filename
+
+
+@dataclass
+class HotFunction:
+    function: str
+    calls: int
+    tottime: float
+    cumtime: float
+
+
+@dataclass
+class RenderProfile:
+    """
+    Профиль одного или нескольких рендеров: tracemalloc и cProfile включаются
+    только внутри размеченных этапов. tracemalloc глобален для процесса —
+    параллельные запросы искажают память, профилируйте по одному.
+    """
+    memory: bool = True
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    profiler: cProfile.Profile = field(default_factory=cProfile.Profile)
+    _depth: int = 0
+
+    def hot_functions(self, limit: int = 10) -> List[HotFunction]:
+        try:
+            stats = pstats.Stats(self.profiler)
+        except TypeError:
+            # ни один этап не выполнялся
+            return []
+        rows = []
+        for (filename, line, name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append(HotFunction(f"{_short_path(filename)}:{line}({name})", ncalls, tottime, cumtime))
+        rows.sort(key=lambda row: row.tottime, reverse=True)
+        return rows[:limit]
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing: длительность этапов в мс."""
+        return ", ".join(
+            f"{name.strip('_')};dur={stats.seconds * 1000:.2f}" for name, stats in self.stages.items()
+        )
+
+    def as_dict(self, limit: int = 10) -> dict:
+        return {
+            "stages": [stats.as_dict() for stats in self.stages.values()],
+            "hot_functions": [asdict(row) for row in self.hot_functions(limit)],
+        }
+
+
+class _Stage:
+    __slots__ = ("profile", "name", "items", "_snapshot", "_base", "_started")
+
+    def __init__(self, profile: RenderProfile, name: str, items: int) -> None:
+        self.profile = profile
+        self.name = name
+        self.items = items
+
+    def __enter__(self) -> "_Stage":
+        profile = self.profile
+        profile._depth += 1
+        if profile._depth > 1:
+            # вложенный этап учитывается во внешнем
+            return self
+        self._snapshot = None
+        if profile.memory:
+            self._snapshot = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+        profile.profiler.enable()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        profile = self.profile
+        profile._depth -= 1
+        if profile._depth:
+            return
+        profile.profiler.disable()
+        stats = profile.stages.setdefault(self.name, StageStats(self.name))
+        stats.calls += 1
+        stats.items += self.items
+        stats.seconds += time.perf_counter() - self._started
+        if self._snapshot is not None:
+            stats.peak_bytes = max(stats.peak_bytes, tracemalloc.get_traced_memory()[1] - self._base)
+            after = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            for diff in after.compare_to(self._snapshot, "lineno"):
+                if diff.size_diff > 0:
+                    stats.retained_bytes += diff.size_diff
+                if diff.count_diff > 0:
+                    stats.retained_blocks += diff.count_diff
+
+
+class _NullStage:
+    # Общий объект, когда профилирование выключено: items можно присвоить, это ничего не стоит
+    __slots__ = ("items",)
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str, items: int = 0):
+    """
+    Разметка этапа рендера. Без активного профиля — общий no-op объект
+    (одна проверка ContextVar на вызов).
+    """
+    profile = _active.get()
+    if profile is None:
+        return _NULL_STAGE
+    return _Stage(profile, name, items)
+
+
+@contextmanager
+def profiling(memory: bool = True) -> Iterator[RenderProfile]:
+    """Включает профиль для текущего контекста (запроса/потока)."""
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    profile = RenderProfile(memory=memory)
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# Состояние текущего запроса: {"pinned": читать с primary, "wrote": была запись}.
+# Вне запроса (management-команды, фоновые потоки) закрепления нет.
+_scope: ContextVar[Optional[Dict[str, bool]]] = ContextVar("menus_replica_scope", default=None)
+
+
+def pin_to_primary() -> None:
+    state = _scope.get()
+    if state is not None:
+        state["pinned"] = state["wrote"] = True
+
+
+def is_pinned() -> bool:
+    state = _scope.get()
+    return bool(state and state["pinned"])
+
+
+@contextmanager
+def request_scope(pinned: bool) -> Iterator[Dict[str, bool]]:
+    """
+    Область одного запроса: начальное закрепление за primary и признак того,
+    что в ходе запроса была запись (state["wrote"]).
+    """
+    state = {"pinned": pinned, "wrote": False}
+    token = _scope.set(state)
+    try:
+        yield state
+    finally:
+        _scope.reset(token)
+
+
+class MenuReplicaRouter:
+    """
+    Роутер БД: чтения моделей приложения menus уходят на реплики
+    (settings.MENUS_REPLICAS) по кругу, всё остальное — на default.
+
+    - запись всегда на primary и «закрепляет» текущий запрос за primary;
+    - недоступная реплика исключается из ротации на MENUS_REPLICA_RETRY_SECONDS;
+    - если доступных реплик нет — чтение с primary.
+    """
+
+    app_label = "menus"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._down_until: Dict[str, float] = {}
+
+    def _replicas(self) -> List[str]:
+        return list(getattr(settings, "MENUS_REPLICAS", []))
+
+    def _available(self, alias: str) -> bool:
+        if self._down_until.get(alias, 0) > time.monotonic():
+            return False
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            retry = getattr(settings, "MENUS_REPLICA_RETRY_SECONDS", 30)
+            self._down_until[alias] = time.monotonic() + retry
+            return False
+        self._down_until.pop(alias, None)
+        return True
+
+    def _next_replica(self) -> Optional[str]:
+        replicas = self._replicas()
+        if not replicas:
+            return None
+        with self._lock:
+            start = next(self._counter) % len(replicas)
+        # по кругу, начиная со следующей реплики; недоступные пропускаем
+        for alias in replicas[start:] + replicas[:start]:
+            if self._available(alias):
+                return alias
+        return None
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label or is_pinned():
+            return DEFAULT_DB_ALIAS
+        return self._next_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики — копии primary, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+# Полнотекстовый индекс SQLite (FTS5, токенизатор trigram) по title/url/named_url,
+# создаётся миграцией 0004 и поддерживается триггерами
+SQLITE_SEARCH_TABLE = "menus_menuitem_search"
+_SQLITE_TRIGGERS = {f"{SQLITE_SEARCH_TABLE}_{suffix}" for suffix in ("ai", "ad", "au")}
+# FTS5 trigram ищет подстроки не короче трёх символов
+_MIN_TRIGRAM = 3
+
+
+def _terms(search_term: str):
+    # Разбиение как у ModelAdmin.get_search_results: кавычки объединяют слова
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        if bit:
+            yield bit
+
+
+def sqlite_search_available(alias: str) -> bool:
+    """
+    Таблица и все триггеры на месте. Пересоздание menus_menuitem в миграции
+    SQLite (ALTER через копию таблицы) удаляет триггеры — тогда индекс
+    устарел бы, и поиск возвращается к icontains.
+    """
+    connection = connections[alias]
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND tbl_name = 'menus_menuitem')",
+            [SQLITE_SEARCH_TABLE],
+        )
+        names = {row[0] for row in cursor.fetchall()}
+    return SQLITE_SEARCH_TABLE in names and _SQLITE_TRIGGERS <= names
+
+
+def indexed_search(queryset: QuerySet, search_term: str) -> Optional[QuerySet]:
+    """
+    Поиск пунктов меню по индексу бэкенда. Каждое слово должно встретиться
+    в title, url или named_url (как в стандартном поиске админки):
+      - SQLite — FTS5 trigram (регистр не важен, в т.ч. для кириллицы);
+      - PostgreSQL — обычный icontains, его обслуживают GIN-индексы
+        pg_trgm по UPPER(поле) из той же миграции.
+    None — индекса нет или слово короче трёх символов: нужен обычный поиск.
+    """
+    if connections[queryset.db].vendor == "postgresql":
+        return None
+    terms = list(_terms(search_term))
+    if not terms or any(len(term) < _MIN_TRIGRAM for term in terms) or not sqlite_search_available(queryset.db):
+        return None
+    # каждое слово — фраза FTS5 в кавычках; пробел между фразами — AND
+    match = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+    sql = f"SELECT rowid FROM {SQLITE_SEARCH_TABLE} WHERE {SQLITE_SEARCH_TABLE} MATCH %s"
+    return queryset.filter(pk__in=RawSQL(sql, [match]))
@@ -0,0 +1,59 @@
+import copy
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from menus.cache import cache_enabled, menu_cache
+from menus.models import Menu, MenuItem, MenuItemTranslation
+
+
+# Изменения публикуются только после коммита: откатанная правка не должна
+# попасть в разделяемое дерево.
+
+@receiver(post_save, sender=MenuItem, dispatch_uid="menus_item_saved")
+def _menu_item_saved(sender, instance: MenuItem, created=False, raw=False, **kwargs):
+    if raw or not cache_enabled():
+        return
+    # Снимок на момент сохранения: живой объект к коммиту может измениться
+    # (delete() в той же транзакции обнуляет pk)
+    item = copy.copy(instance)
+    transaction.on_commit(lambda: menu_cache.item_saved(item, created))
+
+
+@receiver(post_delete, sender=MenuItem, dispatch_uid="menus_item_deleted")
+def _menu_item_deleted(sender, instance: MenuItem, **kwargs):
+    if not cache_enabled():
+        return
+    # pk обнуляется после delete(), поэтому фиксируем его сейчас
+    item_id, menu_id = instance.pk, instance.menu_id
+    transaction.on_commit(lambda: menu_cache.item_deleted(item_id, menu_id))
+
+
+@receiver([post_save, post_delete], sender=Menu, dispatch_uid="menus_menu_changed")
+def _menu_changed(sender, instance: Menu, raw=False, **kwargs):
+    if raw or not cache_enabled():
+        return
+    menu_id, slug = instance.pk, instance.slug
+    transaction.on_commit(lambda: menu_cache.menu_changed(menu_id, slug))
+
+
+@receiver(m2m_changed, sender=MenuItem.groups.through, dispatch_uid="menus_item_groups_changed")
+@receiver(m2m_changed, sender=MenuItem.permissions.through, dispatch_uid="menus_item_permissions_changed")
+def _menu_item_rules_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Группы/права пункта поменялись — маски видимости меню пересчитываются
+    if not action.startswith("post_") or not cache_enabled():
+        return
+    if reverse:
+        menu_ids = set(MenuItem.objects.filter(pk__in=pk_set or ()).values_list("menu_id", flat=True))
+    else:
+        menu_ids = {instance.menu_id}
+    transaction.on_commit(lambda: menu_cache.rules_changed(menu_ids))
+
+
+@receiver([post_save, post_delete], sender=MenuItemTranslation, dispatch_uid="menus_item_translation_changed")
+def _menu_item_translation_changed(sender, instance: MenuItemTranslation, raw=False, **kwargs):
+    if raw or not cache_enabled():
+        return
+    menu_ids = set(MenuItem.objects.filter(pk=instance.item_id).values_list("menu_id", flat=True))
+    transaction.on_commit(lambda: menu_cache.rules_changed(menu_ids))
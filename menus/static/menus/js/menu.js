@@ -0,0 +1,73 @@
+/*
+ * Клиентская разметка активного пункта для кэшируемого на CDN меню.
+ * Повторяет логику draw_menu: активный — по полному пути (с query),
+ * фоллбэк — по path; раскрываются предки и первый уровень детей.
+ */
+(function () {
+  "use strict";
+
+  // скрипт подключается рядом с каждым меню — инициализируемся один раз
+  if (window.menusClientState) {
+    return;
+  }
+  window.menusClientState = true;
+
+  function expand(li) {
+    var ul = li.querySelector(":scope > ul");
+    if (ul) {
+      ul.hidden = false;
+    }
+  }
+
+  function findActive(menu) {
+    var links = menu.querySelectorAll("a[data-url]");
+    var candidates = [location.pathname + location.search, location.pathname];
+    for (var c = 0; c < candidates.length; c++) {
+      for (var i = 0; i < links.length; i++) {
+        if (links[i].getAttribute("data-url") === candidates[c]) {
+          return links[i].parentNode;
+        }
+      }
+    }
+    return null;
+  }
+
+  function markActive(menu) {
+    var active = findActive(menu);
+    if (!active) {
+      return;
+    }
+    active.classList.add("active");
+    expand(active);
+    active.querySelectorAll(":scope > ul > li").forEach(expand);
+
+    var cursor = active.parentNode.closest("li");
+    while (cursor && menu.contains(cursor)) {
+      cursor.classList.add("ancestor");
+      expand(cursor);
+      cursor = cursor.parentNode.closest("li");
+    }
+  }
+
+  function load(placeholder) {
+    fetch(placeholder.getAttribute("data-menu-src"), { credentials: "omit" })
+      .then(function (response) {
+        return response.ok ? response.text() : "";
+      })
+      .then(function (html) {
+        placeholder.innerHTML = html;
+        placeholder.querySelectorAll("ul[data-menu]").forEach(markActive);
+      });
+  }
+
+  function init() {
+    document.querySelectorAll("ul[data-menu]").forEach(markActive);
+    document.querySelectorAll("[data-menu-src]").forEach(load);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", init);
+  } else {
+    init();
+  }
+})();
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
 
 from django import template
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from menus.branch import has_named_route, load_branch, supports_branch_loading
+from menus.cache import cache_enabled, compile_many, current_language, menu_cache, version_cache
+from menus.compiled import CompiledMenu, compile_menu
 from menus.models import MenuItem
+from menus.profiling import stage
+from menus.visibility import hidden_ids, load_rules
 
 register = template.Library()
 
@@ -15,145 +23,252 @@ class Node:
     item: MenuItem
     children: List["Node"] = field(default_factory=list)
     url: str = "#"
+    # заголовок на языке меню (перевод или item.title)
+    title: str = ""
     is_active: bool = False
     is_ancestor: bool = False
     expanded: bool = False
 
 
-def _build_tree(items: List[MenuItem]) -> List[Node]:
-    node_by_id: Dict[int, Node] = {it.id: Node(item=it) for it in items}
-    roots: List[Node] = []
-
-    for node in node_by_id.values():
-        pid = node.item.parent_id
-        if pid and pid in node_by_id:
-            node_by_id[pid].children.append(node)
-        else:
-            roots.append(node)
-
-    def sort_children(n: Node) -> None:
-        n.children.sort(key=lambda c: (c.item.order, c.item.id))
-        for ch in n.children:
-            sort_children(ch)
-
-    for r in roots:
-        sort_children(r)
-    return roots
-
-
-def _mark_active_and_expand(roots: List[Node], full_path: str, path_only: str) -> None:
+def _mark_active_and_expand(
+    menu: CompiledMenu,
+    full_path: str,
+    path_only: str,
+    hidden: FrozenSet[int] = frozenset(),
+) -> Tuple[Optional[int], Set[int], Set[int]]:
     """
     Сначала пытаемся активировать по ПОЛНОМУ пути (включая query-string),
-    если совпадений нет — фоллбэк на path без query.
-    Также раскрываем всех предков и первый уровень детей активного узла.
+    если совпадений нет — фоллбэк на path без query. Скрытые пункты не активируются.
+    Возвращает id активного узла, множество его предков и множество раскрытых
+    узлов: активный, все его предки и первый уровень его детей.
+    """
+    active_id = menu.find_by_url(full_path, hidden)
+    if active_id is None and path_only:
+        active_id = menu.find_by_url(path_only, hidden)
+    if active_id is None:
+        return None, set(), set()
+
+    ancestors = set(menu.ancestors(active_id))
+    expanded = {active_id, *ancestors, *menu.child_ids(active_id)}
+    return active_id, ancestors, expanded
+
+
+def _build_tree(
+    menu: CompiledMenu,
+    active_id: Optional[int],
+    ancestors: Set[int],
+    expanded: Set[int],
+    parent_id: Optional[int] = None,
+    hidden: FrozenSet[int] = frozenset(),
+) -> List[Node]:
     """
-    id_to_parent: Dict[int, Optional[Node]] = {}
-    id_to_node: Dict[int, Node] = {}
+    Строит узлы только для видимой части дерева: корни и дети раскрытых узлов,
+    кроме скрытых для пользователя (hidden — маска из menus.visibility).
+    Скомпилированное меню общее для всех запросов и здесь не изменяется.
+    """
+    nodes: List[Node] = []
+    for item_id in menu.child_ids(parent_id):
+        if item_id in hidden:
+            continue
+        node = Node(
+            item=menu.items[item_id],
+            url=menu.urls[item_id],
+            title=menu.title(item_id),
+            is_active=item_id == active_id,
+            is_ancestor=item_id in ancestors,
+            expanded=item_id in expanded,
+        )
+        if node.expanded:
+            node.children = _build_tree(menu, active_id, ancestors, expanded, item_id, hidden)
+        nodes.append(node)
+    return nodes
 
-    def map_parent(node: Node, parent: Optional[Node]) -> None:
-        id_to_node[node.item.id] = node
-        id_to_parent[node.item.id] = parent
-        for ch in node.children:
-            map_parent(ch, node)
 
-    for r in roots:
-        map_parent(r, None)
+_PREFETCH_KEY = "menus_prefetch_cache"
 
-    for node in id_to_node.values():
-        node.url = node.item.resolved_url
 
-    active: Optional[Node] = None
+def _compile_many(slugs: List[str], language: Optional[str]) -> Dict[str, CompiledMenu]:
+    # Общий кэш процесса, если включён, иначе — сборка на один рендер
+    if cache_enabled():
+        return menu_cache.get_many(slugs, language)
+    return compile_many(slugs, language=language)
 
-    # 1) точное совпадение с полным путём (учитывает ?query)
-    for node in id_to_node.values():
-        if node.url == full_path:
-            node.is_active = True
-            active = node
-            break
 
-    # 2) фоллбэк — сравнение только по path
-    if not active and path_only:
-        for node in id_to_node.values():
-            if node.url == path_only:
-                node.is_active = True
-                active = node
-                break
+def _context_cache(context, language: Optional[str]) -> Dict[str, CompiledMenu]:
+    # Отдельно на каждый язык: {% language %} внутри шаблона переключает дерево
+    return context.render_context.setdefault((_PREFETCH_KEY, language), {})
 
-    if not active:
-        return
 
-    cursor = active
-    while cursor:
-        cursor.expanded = True
-        parent = id_to_parent.get(cursor.item.id)
-        if parent:
-            parent.expanded = True
-            parent.is_ancestor = True
-        cursor = parent
+def _get_menu(context, menu_slug: str) -> CompiledMenu:
+    """
+    Скомпилированное меню для текущего рендера на активном языке: из кэша контекста
+    (menu_prefetch или предыдущий тег на странице), иначе — сборка с сохранением
+    в контекст, чтобы следующие теги для этого меню не делали запросов.
+    """
+    language = current_language()
+    cache = _context_cache(context, language)
+    menu = cache.get(menu_slug)
+    if menu is None:
+        with stage("load") as st:
+            menu = cache[menu_slug] = _compile_many([menu_slug], language)[menu_slug]
+            st.items = len(menu.items)
+    return menu
 
-    for child in active.children:
-        child.expanded = True
 
+def _request_paths(context) -> Tuple[str, str]:
+    request = context.get("request")
+    full_path = "/"
+    path_only = "/"
+    if request is not None:
+        try:
+            full_path = request.get_full_path()  # включает query-string
+        except Exception:
+            full_path = getattr(request, "path", "/")
+        path_only = getattr(request, "path", full_path.split("?", 1)[0])
+    return full_path, path_only
 
-_PREFETCH_KEY = "menus_prefetch_cache"
+
+def _request_user(context):
+    request = context.get("request")
+    user = getattr(request, "user", None)
+    return user if user is not None else context.get("user")
 
 
 @register.simple_tag(takes_context=True)
 def menu_prefetch(context, *slugs: str):
     """
     Префетчит пункты для нескольких меню ОДНИМ запросом и кладёт в кэш контекста.
-    Даже если меню пустое — кладём пустой список, чтобы draw_menu не делал fallback-запрос.
+    Даже если меню пустое — кладём пустое дерево, чтобы draw_menu не делал fallback-запрос.
     """
-    cache: Dict[str, List[MenuItem]] = context.render_context.setdefault(_PREFETCH_KEY, {})
+    language = current_language()
+    cache = _context_cache(context, language)
 
     to_fetch = [s for s in slugs if s and s not in cache]
     if not to_fetch:
         return ""
 
-    items = list(
-        MenuItem.objects.filter(menu__slug__in=to_fetch)
-        .select_related("parent", "menu")
-        .order_by("menu__slug", "parent__id", "order", "id")
-    )
-
-    grouped: Dict[str, List[MenuItem]] = defaultdict(list)
-    for it in items:
-        grouped[it.menu.slug].append(it)
+    with stage("menu_prefetch") as st:
+        fetched = _compile_many(to_fetch, language)
+        st.items = sum(len(menu.items) for menu in fetched.values())
+    cache.update(fetched)
+    return ""
 
-    for slug in to_fetch:
-        cache[slug] = grouped.get(slug, [])
 
-    return ""
+def _get_branch(context, menu_slug: str, full_path: str, path_only: str) -> CompiledMenu:
+    """
+    Видимый срез меню для стратегии "branch". Срез зависит от пути и неполон,
+    поэтому не кладётся ни в кэш контекста, ни в кэш процесса.
+    """
+    language = current_language()
+    if menu_slug in _context_cache(context, language) or cache_enabled() or not supports_branch_loading():
+        return _get_menu(context, menu_slug)
+    with stage("load") as st:
+        items = load_branch(menu_slug, full_path, path_only, language)
+        st.items = len(items)
+        menu = compile_menu(menu_slug, items, rules=load_rules(items), language=language)
+    # named_args/named_kwargs запрос сравнивает только с типовыми написаниями JSON:
+    # введённый вручную JSON ({ "slug": "bikes" }) в срез не попадёт. Если активного
+    # нет, а путь именованный — полная загрузка, чтобы HTML не отличался от "full".
+    if menu.find_by_url(full_path) is None and menu.find_by_url(path_only) is None and has_named_route(path_only):
+        return _get_menu(context, menu_slug)
+    return menu
 
 
-@register.inclusion_tag("menus/draw_menu.html", takes_context=True)
-def draw_menu(context, menu_slug: str):
+@register.simple_tag(takes_context=True)
+def draw_menu(context, menu_slug: str, strategy: Optional[str] = None):
     """
     Рендер меню по slug. Источник данных:
       1) если есть кэш из menu_prefetch — берём оттуда (0 доп. запросов),
-      2) иначе — выполняем 1 запрос для этого меню (fallback).
+      2) иначе — общий кэш процесса (MENUS_CACHE_ENABLED) или 1 запрос для этого меню;
+         результат сохраняется в контексте для остальных тегов страницы.
+    strategy="branch" (или MENUS_LOAD_STRATEGY) без кэша грузит рекурсивным CTE
+    только видимую часть: корни, ветку активного пункта и его детей.
+    Этапы размечены для menus.profiling; шаблон рендерится здесь же, как это
+    делал бы inclusion_tag, чтобы рендер draw_menu.html тоже попадал в профиль.
     """
-    request = context.get("request")
-    full_path = "/"
-    path_only = "/"
-    if request is not None:
-        try:
-            full_path = request.get_full_path()  # включает query-string
-        except Exception:
-            full_path = getattr(request, "path", "/")
-        path_only = getattr(request, "path", full_path.split("?", 1)[0])
+    full_path, path_only = _request_paths(context)
+    strategy = strategy or getattr(settings, "MENUS_LOAD_STRATEGY", "full")
+    if strategy == "branch":
+        menu = _get_branch(context, menu_slug, full_path, path_only)
+    else:
+        menu = _get_menu(context, menu_slug)
 
-    cache: Dict[str, List[MenuItem]] = context.render_context.get(_PREFETCH_KEY, {})
-    items = cache.get(menu_slug)
+    size = len(menu.items)
+    hidden = hidden_ids(menu, _request_user(context))
+    with stage("_mark_active_and_expand", size):
+        active_id, ancestors, expanded = _mark_active_and_expand(menu, full_path, path_only, hidden)
+    with stage("_build_tree", size):
+        roots = _build_tree(menu, active_id, ancestors, expanded, hidden=hidden)
+
+    template = context.template.engine.get_template("menus/draw_menu.html")
+    with stage("render", size):
+        html = template.render(context.new({"nodes": roots, "menu_slug": menu_slug}))
+    return mark_safe(html)
+
+
+_STATIC_HTML_KEY = "menus:html:{slug}:{language}:{version}"
+_STATIC_HTML_TIMEOUT = 60 * 60 * 24
 
-    if items is None:
-        items = list(
-            MenuItem.objects.filter(menu__slug=menu_slug)
-            .select_related("parent", "menu")
-            .order_by("parent__id", "order", "id")
-        )
 
-    roots = _build_tree(items)
-    _mark_active_and_expand(roots, full_path, path_only)
+def render_static_menu(menu: CompiledMenu) -> str:
+    """
+    HTML всего меню без состояния запроса (data-url/data-id для menu.js).
+    Результат зависит только от версии и языка меню, поэтому при включённом кэше
+    хранится в кэше Django и рендерится один раз на (версию, язык).
+    Разметка общая для всех, поэтому содержит только пункты, видимые гостю.
+    """
+    key = _STATIC_HTML_KEY.format(slug=menu.slug, language=menu.language, version=menu.version)
+    if cache_enabled():
+        html = version_cache().get(key)
+        if html is not None:
+            return html
+
+    roots = _build_tree(menu, None, set(), set(menu.items), hidden=hidden_ids(menu, None))
+    html = render_to_string(
+        "menus/draw_menu_static.html",
+        {"nodes": roots, "menu_slug": menu.slug, "version": menu.version},
+    )
+    if cache_enabled():
+        version_cache().set(key, html, timeout=_STATIC_HTML_TIMEOUT)
+    return html
+
+
+@register.inclusion_tag("menus/draw_menu_inline.html", takes_context=True)
+def draw_menu_static(context, menu_slug: str):
+    """
+    Режим для кэширования на CDN: меню рендерится целиком и одинаково для всех
+    страниц, активный пункт и раскрытие проставляет menus/js/menu.js.
+    """
+    menu = _get_menu(context, menu_slug)
+    return {"html": mark_safe(render_static_menu(menu))}
 
-    return {"nodes": roots, "menu_slug": menu_slug}
+
+@register.inclusion_tag("menus/menu_placeholder.html")
+def menu_placeholder(menu_slug: str):
+    """
+    Пустой контейнер, который menus/js/menu.js заполняет фрагментом
+    /menus/<slug>/ — разметка меню целиком отдаётся с edge, без работы на origin.
+    """
+    return {"src": reverse("menu_fragment", kwargs={"slug": menu_slug})}
+
+
+@register.inclusion_tag("menus/breadcrumbs.html", takes_context=True)
+def menu_breadcrumbs(context, menu_slug: str):
+    """
+    Хлебные крошки по тому же скомпилированному дереву, что и draw_menu:
+    цепочка предков активного пункта + сам активный пункт.
+    Если меню на странице уже загружено — без дополнительных запросов.
+    """
+    full_path, path_only = _request_paths(context)
+    menu = _get_menu(context, menu_slug)
+    hidden = hidden_ids(menu, _request_user(context))
+    active_id, _, _ = _mark_active_and_expand(menu, full_path, path_only, hidden)
+    if active_id is None:
+        return {"crumbs": [], "menu_slug": menu_slug}
+
+    chain = [active_id, *menu.ancestors(active_id)]
+    crumbs = [
+        Node(item=menu.items[item_id], url=menu.urls[item_id], title=menu.title(item_id), is_active=item_id == active_id)
+        for item_id in reversed(chain)
+    ]
+    return {"crumbs": crumbs, "menu_slug": menu_slug}
@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from menus.admin import MenuItemAdmin
+from menus.keyset import keyset_segments
+from menus.models import Menu, MenuItem
+from menus.search import sqlite_search_available
+
+
+class MenuItemAdminTests(TestCase):
+    """
+    Changelist пунктов меню на больших таблицах: страницы по курсору без
+    COUNT(*)/OFFSET в порядке индекса menus_item_admin_order и поиск по индексу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pass")
+        cls.main = Menu.objects.create(title="Main", slug="main_menu")
+        cls.footer = Menu.objects.create(title="Footer", slug="footer_menu")
+        cls.about = MenuItem.objects.create(menu=cls.main, title="О компании", url="/about/", order=2)
+        cls.catalog = MenuItem.objects.create(menu=cls.main, title="Каталог", url="/catalog/", order=1)
+        cls.team = MenuItem.objects.create(menu=cls.main, parent=cls.about, title="Команда", url="/about/team/")
+        cls.phones = MenuItem.objects.create(menu=cls.main, parent=cls.catalog, title="Телефоны", url="/catalog/phones/")
+        cls.contacts = MenuItem.objects.create(menu=cls.footer, title="Контакты", url="/contacts/")
+        cls.url = reverse("admin:menus_menuitem_changelist")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def _expected(self):
+        # тот же порядок, что у ordering админки; NULL parent — как в текущей БД
+        items = list(MenuItem.objects.all())
+        nulls_last = connection.features.nulls_order_largest
+        return [
+            item.pk for item in sorted(items, key=lambda i: (
+                i.menu_id, (i.parent_id is None) == nulls_last, i.parent_id or 0, i.order, i.pk,
+            ))
+        ]
+
+    def _pages(self, per_page):
+        seen, url, pages = [], self.url, 0
+        with mock.patch.object(MenuItemAdmin, "list_per_page", per_page):
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                cl = response.context["cl"]
+                self.assertTrue(cl.keyset)
+                seen += [item.pk for item in cl.result_list]
+                if cl.next_url:
+                    self.assertContains(response, "Дальше »")
+                url = self.url + cl.next_url if cl.next_url else None
+                pages += 1
+        return seen, pages
+
+    def test_keyset_segments_cover_rows_after_cursor_in_order(self):
+        fields = ["menu_id", "parent_id", "order", "id"]
+        expected = self._expected()
+        for position, pk in enumerate(expected):
+            values = MenuItem.objects.filter(pk=pk).values_list(*fields).get()
+            after = []
+            for segment in keyset_segments(fields, values, connection.features.nulls_order_largest):
+                after += MenuItem.objects.filter(segment).order_by(*fields).values_list("pk", flat=True)
+            self.assertEqual(after, expected[position + 1:])
+
+    def test_changelist_pages_by_cursor_without_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            seen, pages = self._pages(per_page=2)
+        self.assertEqual(seen, self._expected())
+        self.assertEqual(pages, 3)
+        self.assertFalse([q["sql"] for q in ctx.captured_queries if "COUNT(" in q["sql"].upper()])
+        self.assertFalse([q["sql"] for q in ctx.captured_queries if " OFFSET " in q["sql"].upper()])
+        # неизвестный курсор — как любой неверный параметр changelist
+        response = self.client.get(self.url, {"after": "999999"})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("e=1", response["Location"])
+
+    def test_user_ordering_falls_back_to_paginator(self):
+        response = self.client.get(self.url, {"o": "1"})
+        cl = response.context["cl"]
+        self.assertIsInstance(cl, ChangeList)
+        self.assertFalse(cl.keyset)
+        self.assertEqual(cl.result_count, 5)
+
+    def test_search_is_case_insensitive_and_follows_updates(self):
+        def found(term):
+            response = self.client.get(self.url, {"q": term})
+            return {item.pk for item in response.context["cl"].result_list}
+
+        self.assertEqual(found("КАТАЛ"), {self.catalog.pk})
+        self.assertEqual(found("catalog phones"), {self.phones.pk})
+        self.assertEqual(found("/about/"), {self.about.pk, self.team.pk})
+        # короткие слова — обычный icontains
+        self.assertEqual(found("о"), {self.about.pk, self.catalog.pk, self.team.pk, self.phones.pk, self.contacts.pk})
+
+        self.contacts.title = "Связь"
+        self.contacts.save()
+        self.assertEqual(found("контакт"), set())
+        self.assertEqual(found("связь"), {self.contacts.pk})
+        self.phones.delete()
+        self.assertEqual(found("phones"), set())
+
+    def test_sqlite_search_index_installed(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("FTS5 только на SQLite")
+        self.assertTrue(sqlite_search_available(connection.alias))
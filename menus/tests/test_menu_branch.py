@@ -0,0 +1,62 @@
+import json
+
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase
+
+from menus.branch import load_branch
+from menus.models import Menu, MenuItem
+
+
+class MenuBranchLoadingTests(TestCase):
+    """
+    Стратегия "branch": рекурсивный CTE грузит только видимую часть меню,
+    а HTML совпадает с полной загрузкой.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Main", slug="main_menu")
+        cls.home = MenuItem.objects.create(menu=cls.menu, title="Главная", named_url="home", order=0)
+        cls.catalog = MenuItem.objects.create(menu=cls.menu, title="Каталог", named_url="catalog", order=1)
+        cls.bikes = MenuItem.objects.create(
+            menu=cls.menu, parent=cls.catalog, title="Велосипеды",
+            named_url="catalog_item", named_kwargs=json.dumps({"slug": "bikes"}), order=0,
+        )
+        cls.skates = MenuItem.objects.create(
+            menu=cls.menu, parent=cls.catalog, title="Ролики",
+            named_url="catalog_item", named_kwargs=json.dumps({"slug": "skates"}), order=1,
+        )
+        cls.road = MenuItem.objects.create(menu=cls.menu, parent=cls.bikes, title="Шоссейные", url="/catalog/bikes/?type=road")
+        cls.wheels = MenuItem.objects.create(menu=cls.menu, parent=cls.road, title="Колёса", url="/catalog/bikes/road/wheels/")
+        cls.spokes = MenuItem.objects.create(menu=cls.menu, parent=cls.wheels, title="Спицы", url="/catalog/bikes/road/wheels/spokes/")
+        cls.kids = MenuItem.objects.create(menu=cls.menu, parent=cls.skates, title="Детские", url="/catalog/skates/kids/")
+        # named_url с namespace: совпадает с ResolverMatch.view_name, а не url_name
+        cls.service = MenuItem.objects.create(menu=cls.menu, title="Сервис", url="/service/", order=2)
+        cls.admin_index = MenuItem.objects.create(menu=cls.menu, parent=cls.service, title="Админка", named_url="admin:index")
+
+    def _render(self, tpl: str, path: str) -> str:
+        return Template(tpl).render(RequestContext(RequestFactory().get(path), {}))
+
+    def test_branch_html_matches_full_load(self):
+        for path in ["/", "/catalog/", "/catalog/bikes/", "/catalog/bikes/?type=road", "/catalog/skates/kids/", "/admin/"]:
+            with self.subTest(path=path):
+                with self.assertNumQueries(1):
+                    branch = self._render("{% draw_menu 'main_menu' strategy='branch' %}", path)
+                self.assertEqual(branch, self._render("{% draw_menu 'main_menu' %}", path))
+
+    def test_branch_matches_full_load_for_hand_written_json(self):
+        # JSON из админки с пробелами: ни одно из типовых написаний json.dumps
+        MenuItem.objects.filter(pk=self.bikes.pk).update(named_kwargs='{ "slug" :  "bikes" }')
+        path = "/catalog/bikes/"
+        full = self._render("{% draw_menu 'main_menu' %}", path)
+        self.assertIn('class="active"', full)
+        self.assertIn("Шоссейные", full)
+        self.assertEqual(self._render("{% draw_menu 'main_menu' strategy='branch' %}", path), full)
+
+    def test_branch_loads_only_visible_slice(self):
+        ids = {it.id for it in load_branch("main_menu", "/catalog/bikes/", "/catalog/bikes/")}
+        # корни, ветка, соседи, дети активного и их дети; ветка «Ролики» не грузится
+        self.assertEqual(
+            ids,
+            {self.home.id, self.catalog.id, self.service.id, self.bikes.id, self.skates.id, self.road.id, self.wheels.id},
+        )
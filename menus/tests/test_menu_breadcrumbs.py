@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from menus.cache import menu_cache
+from menus.models import Menu, MenuItem
+
+
+class MenuBreadcrumbsSitemapTests(TestCase):
+    """
+    Хлебные крошки и sitemap.xml поверх общего скомпилированного дерева.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Main", slug="main_menu")
+        cls.catalog = MenuItem.objects.create(menu=cls.menu, title="Каталог", url="/catalog/", order=0)
+        cls.bikes = MenuItem.objects.create(menu=cls.menu, parent=cls.catalog, title="Велосипеды", url="/catalog/bikes/")
+        cls.road = MenuItem.objects.create(menu=cls.menu, parent=cls.bikes, title="Шоссейные", url="/catalog/bikes/?type=road")
+        cls.dup = MenuItem.objects.create(menu=cls.menu, title="Дубль", url="/catalog/", order=1)
+        cls.external = MenuItem.objects.create(menu=cls.menu, title="Внешний", url="https://example.com/", order=2)
+
+    def _render(self, tpl: str, path: str) -> str:
+        return Template(tpl).render(RequestContext(RequestFactory().get(path), {}))
+
+    def test_breadcrumbs_share_query_with_draw_menu(self):
+        tpl = "{% draw_menu 'main_menu' %}{% menu_breadcrumbs 'main_menu' %}"
+        with self.assertNumQueries(1):
+            html = self._render(tpl, "/catalog/bikes/?type=road")
+        crumbs = html[html.index('<ol class="breadcrumbs'):]
+        self.assertLess(crumbs.index("Каталог"), crumbs.index("Велосипеды"))
+        self.assertIn('<li class="active" aria-current="page">Шоссейные</li>', crumbs)
+
+    def test_breadcrumbs_empty_without_active(self):
+        self.assertNotIn("breadcrumbs", self._render("{% menu_breadcrumbs 'main_menu' %}", "/nowhere/"))
+
+    def test_sitemap_streams_unique_local_urls(self):
+        response = self.client.get(reverse("menu_sitemap", kwargs={"slug": "main_menu"}))
+        self.assertTrue(response.streaming)
+        xml = b"".join(response.streaming_content).decode()
+        self.assertEqual(xml.count("<loc>http://testserver/catalog/</loc>"), 1)
+        self.assertIn("<loc>http://testserver/catalog/bikes/?type=road</loc>", xml)
+        self.assertNotIn("example.com", xml)
+        self.assertTrue(xml.rstrip().endswith("</urlset>"))
+
+    @override_settings(MENUS_CACHE_ENABLED=True, MENUS_SITEMAP=None)
+    def test_sitemap_of_all_menus_bypasses_process_cache(self):
+        menu_cache.clear()
+        cache.clear()
+        footer = Menu.objects.create(title="Footer", slug="footer_menu")
+        MenuItem.objects.create(menu=footer, title="Каталог", url="/catalog/")
+        MenuItem.objects.create(menu=footer, title="Контакты", url="/contacts/")
+        xml = b"".join(self.client.get("/sitemap.xml").streaming_content).decode()
+        # URL из нескольких меню — один раз
+        self.assertEqual(xml.count("<loc>http://testserver/catalog/</loc>"), 1)
+        self.assertIn("<loc>http://testserver/contacts/</loc>", xml)
+        self.assertEqual(menu_cache.stats()["entries"], 0)
@@ -0,0 +1,232 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from menus.cache import menu_cache
+from menus.checks import check_version_cache
+from menus.compiled import DeltaError, compile_menu
+from menus.models import Menu, MenuItem
+
+
+@override_settings(MENUS_CACHE_ENABLED=True)
+class MenuCacheTests(TestCase):
+    """
+    Процессный кэш скомпилированных деревьев и инкрементальные дельты:
+    - повторный рендер без запросов
+    - правка/вставка/перенос/удаление пункта без полной пересборки
+    - фоллбэк на пересборку, если дельту применить нельзя
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Main", slug="main_menu")
+        cls.a = MenuItem.objects.create(menu=cls.menu, title="A", url="/a/", order=0)
+        cls.b = MenuItem.objects.create(menu=cls.menu, title="B", url="/b/", order=1)
+        cls.a1 = MenuItem.objects.create(menu=cls.menu, parent=cls.a, title="A1", url="/a/1/", order=0)
+        cls.a11 = MenuItem.objects.create(menu=cls.menu, parent=cls.a1, title="A11", url="/a/1/1/", order=0)
+
+    def setUp(self):
+        menu_cache.clear()
+        cache.clear()
+
+    def _render(self, path: str) -> str:
+        request = RequestFactory().get(path)
+        return Template("{% draw_menu 'main_menu' %}").render(RequestContext(request, {}))
+
+    def _save(self, item: MenuItem) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+
+    def test_second_render_uses_process_cache(self):
+        self._render("/")
+        with self.assertNumQueries(0):
+            html = self._render("/a/1/")
+        self.assertIn("A11", html)
+
+    def test_title_edit_is_patched_in_a_copy(self):
+        compiled = menu_cache.get("main_menu")
+        version = compiled.version
+        self.a1.title = "A1 renamed"
+        with self.assertNumQueries(1):  # только UPDATE, без перезагрузки меню
+            self._save(self.a1)
+        patched = menu_cache.get("main_menu")
+        self.assertIsNot(patched, compiled)
+        self.assertEqual(patched.version, version + 1)
+        # опубликованное дерево не меняется: параллельный читатель видит его целиком
+        self.assertEqual(compiled.version, version)
+        self.assertEqual(compiled.title(self.a1.id), "A1")
+        with self.assertNumQueries(0):
+            self.assertIn("A1 renamed", self._render("/a/"))
+
+    def test_insert_and_move(self):
+        compiled = menu_cache.get("main_menu")
+        new = MenuItem(menu=self.menu, parent=self.b, title="B1", url="/b/1/", order=0)
+        self._save(new)
+        patched = menu_cache.get("main_menu")
+        self.assertEqual(patched.child_ids(self.b.id), [new.id])
+        self.assertEqual(patched.find_by_url("/b/1/"), new.id)
+        self.assertEqual(compiled.child_ids(self.b.id), [])
+        self.assertNotIn(new.id, compiled.urls)
+
+        self.a1.parent = self.b
+        self.a1.order = 5
+        self._save(self.a1)
+        moved = menu_cache.get("main_menu")
+        self.assertEqual(moved.version, patched.version + 1)
+        self.assertEqual(moved.child_ids(self.b.id), [new.id, self.a1.id])
+        self.assertEqual(moved.child_ids(self.a.id), [])
+        self.assertEqual(moved.ancestors(self.a11.id), [self.a1.id, self.b.id])
+        self.assertEqual(patched.child_ids(self.a.id), [self.a1.id])
+
+    def test_delete_removes_subtree(self):
+        compiled = menu_cache.get("main_menu")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.a1.delete()
+        patched = menu_cache.get("main_menu")
+        self.assertNotIn(self.a11.id, patched.items)
+        self.assertIsNone(patched.find_by_url("/a/1/1/"))
+        self.assertIn(self.a11.id, compiled.items)
+        self.assertEqual(compiled.find_by_url("/a/1/1/"), self.a11.id)
+
+    def test_cycle_falls_back_to_rebuild(self):
+        compiled = menu_cache.get("main_menu")
+        self.a.parent = self.a11
+        self._save(self.a)
+        rebuilt = menu_cache.get("main_menu")
+        self.assertIsNot(rebuilt, compiled)
+        # цикл недостижим от корней и в дерево не попадает
+        self.assertNotIn(self.a.id, rebuilt.items)
+
+        # разрыв цикла: пункт не новый, но в дереве его нет — вставлять
+        # дельтой нельзя (потерялись бы дети), только пересборка
+        self.a.parent = None
+        self._save(self.a)
+        repaired = menu_cache.get("main_menu")
+        self.assertEqual(sorted(repaired.items), sorted([self.a.id, self.b.id, self.a1.id, self.a11.id]))
+        self.assertEqual(repaired.ancestors(self.a11.id), [self.a1.id, self.a.id])
+
+    def test_create_and_delete_in_one_transaction(self):
+        menu_cache.get("main_menu")
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                temp = MenuItem.objects.create(menu=self.menu, title="Temp", url="/temp/", order=0)
+                temp_id = temp.id
+                temp.delete()
+        compiled = menu_cache.get("main_menu")
+        self.assertNotIn(temp_id, compiled.items)
+        self.assertNotIn(None, compiled.items)
+        self.assertEqual([i for i, _ in compiled.walk()], [self.a.id, self.a1.id, self.a11.id, self.b.id])
+
+    def test_saved_item_without_pk_drops_menu(self):
+        compiled = menu_cache.get("main_menu")
+        menu_cache.item_saved(MenuItem(menu=self.menu, title="Gone", url="/gone/"))
+        rebuilt = menu_cache.get("main_menu")
+        self.assertIsNot(rebuilt, compiled)
+        self.assertNotIn(None, rebuilt.items)
+
+    def test_other_process_version_forces_rebuild(self):
+        compiled = menu_cache.get("main_menu")
+        cache.incr("menus:version:main_menu")
+        self.assertIsNot(menu_cache.get("main_menu"), compiled)
+
+    def test_local_version_cache_is_reported(self):
+        self.assertEqual([m.id for m in check_version_cache()], ["menus.W005"])
+        shared = {"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "menus_versions"}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_version_cache(), [])
+        with override_settings(MENUS_CACHE_ENABLED=False):
+            self.assertEqual(check_version_cache(), [])
+
+    def test_evicted_version_key_is_not_reused(self):
+        compiled = menu_cache.get("main_menu")
+        cache.delete("menus:version:main_menu")
+        # правка в другом процессе после вытеснения ключа: версия не начинается с 1 заново
+        MenuItem.objects.filter(pk=self.b.pk).update(title="B remote")
+        menu_cache._bump("main_menu")
+        self.assertNotEqual(cache.get("menus:version:main_menu"), compiled.version)
+        rebuilt = menu_cache.get("main_menu")
+        self.assertIsNot(rebuilt, compiled)
+        self.assertEqual(rebuilt.title(self.b.id), "B remote")
+
+    def test_missing_version_key_is_a_miss(self):
+        compiled = menu_cache.get("main_menu")
+        cache.delete("menus:version:main_menu")
+        self.assertIsNot(menu_cache.get("main_menu"), compiled)
+
+    def test_compiled_delta_rejects_unknown_parent(self):
+        compiled = compile_menu("main_menu", MenuItem.objects.filter(menu=self.menu))
+        orphan = MenuItem(id=10_000, menu=self.menu, parent_id=9_999, title="X")
+        with self.assertRaises(DeltaError):
+            compiled.apply_save(orphan, "/x/")
+        unreachable = MenuItem(id=10_001, menu=self.menu, title="Y")
+        with self.assertRaises(DeltaError):
+            compiled.apply_save(unreachable, "/y/", created=False)
+
+
+@override_settings(MENUS_CACHE_ENABLED=True)
+class BoundedMenuCacheTests(TestCase):
+    """
+    Ограничение кэша для множества меню: LRU по числу записей и по памяти,
+    счётчики и пакетное получение.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(4):
+            menu = Menu.objects.create(title=f"Tenant {n}", slug=f"tenant_{n}")
+            MenuItem.objects.create(menu=menu, title=f"Item {n}", url=f"/t{n}/")
+
+    def setUp(self):
+        menu_cache.clear()
+        cache.clear()
+
+    def test_get_many_is_one_query_and_counts(self):
+        slugs = [f"tenant_{n}" for n in range(4)]
+        with self.assertNumQueries(1):
+            menu_cache.get_many(slugs)
+        with self.assertNumQueries(0):
+            menu_cache.get_many(slugs)
+        stats = menu_cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"]), (4, 4, 4))
+        self.assertGreater(stats["bytes"], 0)
+
+    @override_settings(MENUS_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_is_evicted(self):
+        menu_cache.get("tenant_0")
+        menu_cache.get("tenant_1")
+        menu_cache.get("tenant_0")
+        menu_cache.get("tenant_2")
+        with self.assertNumQueries(0):
+            menu_cache.get("tenant_0")
+        with self.assertNumQueries(1):
+            menu_cache.get("tenant_1")
+        self.assertEqual(menu_cache.stats()["evictions"], 2)
+
+    def test_byte_limit_and_delta_accounting(self):
+        one = menu_cache.get("tenant_0").size
+        with override_settings(MENUS_CACHE_MAX_BYTES=one * 2):
+            menu_cache.get_many(["tenant_1", "tenant_2", "tenant_3"])
+            self.assertEqual(menu_cache.stats()["entries"], 2)
+
+        before = menu_cache.get("tenant_3")
+        item = MenuItem.objects.get(title="Item 3")
+        item.title = "Item 3 with a much longer title"
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        with self.assertNumQueries(0):
+            compiled = menu_cache.get("tenant_3")
+        self.assertEqual(compiled.version, before.version + 1)
+        rebuilt = compile_menu("tenant_3", MenuItem.objects.filter(menu__slug="tenant_3"))
+        self.assertEqual(compiled.size, rebuilt.size)
+        self.assertEqual(menu_cache.stats()["bytes"], sum(c.size for c in menu_cache._menus.values()))
+
+    def test_item_moved_to_another_menu(self):
+        menu_cache.get_many(["tenant_0", "tenant_1"])
+        item = MenuItem.objects.get(title="Item 0")
+        self.assertIsNone(menu_cache._moved_from(item.id, item.menu_id))
+        item.menu = Menu.objects.get(slug="tenant_1")
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assertNotIn(item.id, menu_cache.get("tenant_0").items)
+        self.assertIn(item.id, menu_cache.get("tenant_1").items)
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from menus.cache import menu_cache
+from menus.models import Menu, MenuItem
+
+
+class MenuFragmentTests(TestCase):
+    """
+    Режим без состояния запроса для CDN:
+    - draw_menu_static одинаков для любых страниц
+    - фрагмент /menus/<slug>/ с ETag и версионный фрагмент с immutable
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Main", slug="main_menu")
+        cls.catalog = MenuItem.objects.create(menu=cls.menu, title="Каталог", url="/catalog/", order=0)
+        cls.bikes = MenuItem.objects.create(menu=cls.menu, parent=cls.catalog, title="Велосипеды", url="/catalog/bikes/")
+
+    def setUp(self):
+        menu_cache.clear()
+        cache.clear()
+
+    def _render(self, path: str) -> str:
+        request = RequestFactory().get(path)
+        return Template("{% draw_menu_static 'main_menu' %}").render(RequestContext(request, {}))
+
+    def test_static_menu_does_not_depend_on_path(self):
+        html = self._render("/")
+        self.assertEqual(html, self._render("/catalog/bikes/"))
+        self.assertIn('data-url="/catalog/bikes/"', html)
+        self.assertIn("<ul hidden>", html)
+        self.assertNotIn('class="active"', html)
+
+    def test_placeholder_points_to_fragment(self):
+        html = Template("{% menu_placeholder 'main_menu' %}").render(RequestContext(RequestFactory().get("/"), {}))
+        self.assertIn('data-menu-src="%s"' % reverse("menu_fragment", kwargs={"slug": "main_menu"}), html)
+
+    def test_fragment_without_cache_is_short_lived(self):
+        response = self.client.get(reverse("menu_fragment", kwargs={"slug": "main_menu"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age=60", response["Cache-Control"])
+        self.assertContains(response, "Велосипеды")
+
+    @override_settings(MENUS_CACHE_ENABLED=True)
+    def test_versioned_fragment_and_etag(self):
+        version = menu_cache.get("main_menu").version
+        url = reverse("menu_fragment", kwargs={"slug": "main_menu"})
+
+        response = self.client.get(url)
+        etag = response["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        versioned = reverse("menu_fragment_version", kwargs={"slug": "main_menu", "version": version})
+        response = self.client.get(versioned)
+        self.assertIn("immutable", response["Cache-Control"])
+
+        stale = reverse("menu_fragment_version", kwargs={"slug": "main_menu", "version": version + 10})
+        self.assertRedirects(self.client.get(stale), versioned, fetch_redirect_response=False)
+
+    @override_settings(MENUS_CACHE_ENABLED=True)
+    def test_unknown_slug_is_404_and_not_cached(self):
+        for n in range(3):
+            self.assertEqual(self.client.get(reverse("menu_fragment", kwargs={"slug": f"nope{n}"})).status_code, 404)
+            self.assertEqual(self.client.get(reverse("menu_sitemap", kwargs={"slug": f"nope{n}"})).status_code, 404)
+        self.assertEqual(menu_cache.stats()["entries"], 0)
+        self.assertIsNone(cache.get("menus:version:nope0"))
@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import translation
+
+from menus.cache import menu_cache
+from menus.models import Menu, MenuItem, MenuItemTranslation
+
+
+@override_settings(LANGUAGE_CODE="ru", LANGUAGES=[("ru", "Русский"), ("en", "English")])
+class MenuTranslationTests(TestCase):
+    """
+    Переводы заголовков/URL: грузятся тем же запросом, что и пункты,
+    дерево компилируется и кэшируется отдельно на каждый язык.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Main", slug="main_menu")
+        cls.catalog = MenuItem.objects.create(menu=cls.menu, title="Каталог", url="/catalog/", order=0)
+        cls.bikes = MenuItem.objects.create(menu=cls.menu, parent=cls.catalog, title="Велосипеды", url="/catalog/bikes/")
+        MenuItemTranslation.objects.create(item=cls.catalog, language="en", title="Catalog", url="/en/catalog/")
+        # только заголовок: URL остаётся исходным
+        cls.bikes_en = MenuItemTranslation.objects.create(item=cls.bikes, language="en", title="Bikes")
+
+    def setUp(self):
+        menu_cache.clear()
+        cache.clear()
+
+    def _render(self, path: str, language: str, tpl: str = "{% draw_menu 'main_menu' %}") -> str:
+        with translation.override(language):
+            return Template(tpl).render(RequestContext(RequestFactory().get(path), {}))
+
+    def test_translation_loaded_in_same_query(self):
+        with self.assertNumQueries(1):
+            html = self._render("/en/catalog/", "en")
+        self.assertIn('<a href="/en/catalog/">Catalog</a>', html)
+        self.assertIn('<a href="/catalog/bikes/">Bikes</a>', html)
+        self.assertIn('class="active"', html)
+
+        html = self._render("/catalog/", "ru")
+        self.assertIn('<a href="/catalog/">Каталог</a>', html)
+        self.assertIn("Велосипеды", html)
+
+    def test_branch_strategy_matches_translated_url(self):
+        tpl = "{% draw_menu 'main_menu' strategy='branch' %}"
+        self.assertEqual(self._render("/en/catalog/", "en", tpl), self._render("/en/catalog/", "en"))
+
+    def test_fragment_and_sitemap_use_active_language_without_cache(self):
+        with translation.override("en"):
+            fragment = self.client.get(reverse("menu_fragment", kwargs={"slug": "main_menu"}))
+            sitemap = b"".join(
+                self.client.get(reverse("menu_sitemap", kwargs={"slug": "main_menu"})).streaming_content
+            ).decode()
+        self.assertContains(fragment, "Catalog")
+        self.assertNotContains(fragment, "Каталог")
+        self.assertIn("<loc>http://testserver/en/catalog/</loc>", sitemap)
+
+    @override_settings(MENUS_CACHE_ENABLED=True)
+    def test_trees_cached_per_language_and_patched_together(self):
+        self._render("/", "en")
+        self._render("/", "ru")
+        with self.assertNumQueries(0):
+            self.assertIn("Catalog", self._render("/", "en"))
+            self.assertIn("Каталог", self._render("/", "ru"))
+
+        # дельта применяется к обоим языкам, перевод пункта сохраняется
+        self.catalog.url = "/katalog/"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.catalog.save()
+        self.assertEqual(menu_cache.stats()["entries"], 2)
+        with self.assertNumQueries(0):
+            self.assertIn('<a href="/en/catalog/">Catalog</a>', self._render("/", "en"))
+            self.assertIn('<a href="/katalog/">Каталог</a>', self._render("/", "ru"))
+
+    @override_settings(MENUS_CACHE_ENABLED=True)
+    def test_translation_change_rebuilds_menu(self):
+        self.assertIn("Bikes", self._render("/en/catalog/", "en"))
+        self.bikes_en.title = "Bicycles"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bikes_en.save()
+        self.assertIn("Bicycles", self._render("/en/catalog/", "en"))
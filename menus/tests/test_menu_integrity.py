@@ -0,0 +1,76 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from menus.checks import check_menu_integrity
+from menus.integrity import check_menus
+from menus.models import Menu, MenuItem
+
+
+@override_settings(MENUS_INTEGRITY_SYSTEM_CHECK=True)
+class MenuIntegrityTests(TestCase):
+    """
+    Проверка целостности меню: команда check_menus и системная проверка.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.main = Menu.objects.create(title="Main", slug="main_menu")
+        cls.footer = Menu.objects.create(title="Footer", slug="footer_menu")
+        cls.root = MenuItem.objects.create(menu=cls.main, title="Root", url="/root/")
+        cls.a = MenuItem.objects.create(menu=cls.main, parent=cls.root, title="A", url="/a/")
+        cls.b = MenuItem.objects.create(menu=cls.main, parent=cls.a, title="B", url="/b/")
+        cls.foreign = MenuItem.objects.create(menu=cls.footer, title="Foreign", url="/a/")
+
+    def test_clean_tree_has_no_problems(self):
+        report = check_menus(batch_size=2)
+        self.assertTrue(report.ok)
+        self.assertEqual(report.checked, 4)
+        self.assertEqual(check_menu_integrity(databases=["default"]), [])
+
+    def test_detects_and_repairs_structural_problems(self):
+        # правки «в обход» clean(): цикл, чужой родитель, дубликат URL
+        MenuItem.objects.filter(id=self.a.id).update(parent=self.b)
+        MenuItem.objects.filter(id=self.foreign.id).update(parent=self.root)
+        MenuItem.objects.create(menu=self.main, title="Dup", url="/root/")
+
+        out = StringIO()
+        call_command("check_menus", "--batch-size=2", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertFalse(report["ok"])
+        self.assertEqual(report["cycles"], [sorted([self.a.id, self.b.id])])
+        self.assertEqual([row["id"] for row in report["cross_menu"]], [self.foreign.id])
+        self.assertEqual(report["duplicate_urls"], [{"menu_id": self.main.id, "url": "/root/", "count": 2}])
+        ids = {m.id for m in check_menu_integrity(databases=["default"])}
+        self.assertEqual(ids, {"menus.W001", "menus.W003", "menus.W004"})
+
+        call_command("check_menus", "--repair", stdout=StringIO())
+        report = check_menus()
+        self.assertEqual((report.cycles, report.cross_menu), ([], []))
+        self.assertIsNone(MenuItem.objects.get(id=self.foreign.id).parent_id)
+
+    def test_system_check_skipped_without_database(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(check_menu_integrity(), [])
+
+    @override_settings(MENUS_INTEGRITY_SYSTEM_CHECK=False)
+    def test_system_check_is_opt_in(self):
+        MenuItem.objects.filter(id=self.a.id).update(parent=self.b)
+        with self.assertNumQueries(0):
+            self.assertEqual(check_menu_integrity(databases=["default"]), [])
+
+    def test_problems_are_found_per_menu(self):
+        # батчи рвут меню посередине, цикл — во втором меню, ссылка — между меню
+        x = MenuItem.objects.create(menu=self.footer, title="X", url="/x/")
+        y = MenuItem.objects.create(menu=self.footer, parent=x, title="Y", url="/y/")
+        MenuItem.objects.filter(id=x.id).update(parent=y)
+        MenuItem.objects.filter(id=self.b.id).update(parent=self.foreign)
+        report = check_menus(batch_size=2)
+        self.assertEqual(report.checked, 6)
+        self.assertEqual(report.cycles, [sorted([x.id, y.id])])
+        self.assertEqual(report.cross_menu, [{
+            "id": self.b.id, "menu_id": self.main.id, "parent_id": self.foreign.id, "parent_menu_id": self.footer.id,
+        }])
+        self.assertEqual(report.orphans, [])
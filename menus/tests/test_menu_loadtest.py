@@ -0,0 +1,47 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from menus.loadtest import build_plan, percentile
+from menus.models import Menu, MenuItem
+
+
+class LoadTestHelpersTests(SimpleTestCase):
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual((percentile(values, 0.5), percentile(values, 0.99), percentile(values, 1.0)), (50.0, 99.0, 100.0))
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_plan_respects_weights_and_empty_pools(self):
+        plan = build_plan({"home": ["/"], "catalog": ["/catalog/"], "admin": []}, {"home": 0, "catalog": 1, "admin": 5}, 20, seed=1)
+        self.assertEqual(plan, [("catalog", "/catalog/")] * 20)
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """
+    Команда loadtest_menus: оба приложения в процессе, оба пула клиентов.
+    Серверные потоки ходят в базу своими соединениями — данные должны быть закоммичены.
+    """
+
+    def setUp(self):
+        menu = Menu.objects.create(title="Main", slug="main_menu")
+        MenuItem.objects.create(menu=menu, title="Bikes", url="/catalog/bikes/")
+
+    def test_both_servers_and_clients(self):
+        for client in ("threads", "asyncio"):
+            with self.subTest(client=client):
+                out = StringIO()
+                call_command(
+                    "loadtest_menus", "--requests=12", "--warmup=0", "--concurrency=2",
+                    f"--client={client}", "--mix=home=1,catalog=1,admin=0", "--json",
+                    stdout=out, stderr=StringIO(),
+                )
+                results = json.loads(out.getvalue())
+                self.assertEqual([r["server"] for r in results], ["wsgi", "asgi"])
+                for result in results:
+                    total = result["endpoints"][-1]
+                    self.assertEqual((total["label"], total["requests"], total["errors"]), ("total", 12, 0))
+                    # одна выборка пунктов меню на страницу
+                    self.assertEqual(total["queries_per_request"], 1.0)
@@ -0,0 +1,64 @@
+import json
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from menus.models import Menu, MenuItem
+from menus.profiling import profiling, stage
+
+_MIDDLEWARE = [*settings.MIDDLEWARE, "menus.middleware.MenuProfilingMiddleware"]
+
+
+class MenuProfilingTests(TestCase):
+    """
+    Профилирование рендера меню: команда по размерам меню и middleware по запросу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        menu = Menu.objects.create(title="Main", slug="main_menu")
+        MenuItem.objects.create(menu=menu, title="Bikes", url="/catalog/bikes/")
+        cls.staff = User.objects.create_user("staff", is_staff=True)
+
+    def test_stage_is_noop_without_profile(self):
+        self.assertIs(stage("render"), stage("_build_tree"))
+        with profiling(memory=False) as profile:
+            with stage("render", 10):
+                pass
+        self.assertEqual((profile.stages["render"].calls, profile.stages["render"].items), (1, 10))
+
+    def test_command_reports_stages_per_size(self):
+        out = StringIO()
+        call_command("profile_menus", "--sizes=5,30", "--top=3", "--json", stdout=out)
+        reports = json.loads(out.getvalue())
+        self.assertEqual([r["size"] for r in reports], [5, 30])
+        for report in reports:
+            names = [s["name"] for s in report["stages"]]
+            self.assertEqual(names, ["menu_prefetch", "_mark_active_and_expand", "_build_tree", "render"])
+            self.assertGreater(report["stages"][0]["retained_bytes"], 0)
+            self.assertEqual(len(report["hot_functions"]), 3)
+        self.assertFalse(Menu.objects.filter(slug="profile_menu").exists())
+
+    @override_settings(MENUS_CACHE_ENABLED=True)
+    def test_command_profiles_each_size_with_process_cache(self):
+        out = StringIO()
+        call_command("profile_menus", "--sizes=10,40", "--top=1", "--json", stdout=out)
+        for report, size in zip(json.loads(out.getvalue()), [10, 40]):
+            stages = {s["name"]: s for s in report["stages"]}
+            # загрузка измеряется, а не берётся из кэша от прогрева или прошлого размера
+            self.assertEqual(stages["menu_prefetch"]["items"], size)
+            self.assertEqual(stages["render"]["items"], size)
+
+    @override_settings(MIDDLEWARE=_MIDDLEWARE)
+    def test_middleware_is_opt_in(self):
+        self.assertNotIn("Server-Timing", self.client.get("/catalog/bikes/?menus_profile=1"))
+
+        self.client.force_login(self.staff)
+        self.assertNotIn("Server-Timing", self.client.get("/catalog/bikes/"))
+        with self.assertLogs("menus.profiling", "INFO"):
+            response = self.client.get("/catalog/bikes/?menus_profile=1")
+        self.assertIn("build_tree;dur=", response["Server-Timing"])
+        self.assertIn("render;dur=", response["Server-Timing"])
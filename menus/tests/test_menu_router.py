@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from menus.cache import menu_cache
+from menus.middleware import PIN_COOKIE
+from menus.models import Menu, MenuItem
+from menus.routers import MenuReplicaRouter, request_scope
+
+
+@override_settings(MENUS_REPLICAS=["replica_1", "replica_2"])
+class MenuReplicaRouterTests(SimpleTestCase):
+    """
+    Роутер реплик: round-robin, фоллбэк на primary, read-your-writes.
+    """
+
+    def setUp(self):
+        self.router = MenuReplicaRouter()
+
+    def test_round_robin_for_menu_reads_only(self):
+        with mock.patch.object(self.router, "_available", return_value=True):
+            picks = [self.router.db_for_read(MenuItem) for _ in range(3)]
+            self.assertEqual(picks, ["replica_1", "replica_2", "replica_1"])
+            self.assertEqual(self.router.db_for_read(User), "default")
+
+    def test_unavailable_replica_is_skipped(self):
+        with mock.patch.object(self.router, "_available", side_effect=lambda alias: alias == "replica_2"):
+            self.assertEqual(self.router.db_for_read(MenuItem), "replica_2")
+        with mock.patch.object(self.router, "_available", return_value=False):
+            self.assertEqual(self.router.db_for_read(MenuItem), "default")
+
+    def test_failed_connection_marks_replica_down(self):
+        broken = mock.Mock()
+        broken.ensure_connection.side_effect = OperationalError("down")
+        with mock.patch("menus.routers.connections", {"replica_1": broken}):
+            self.assertFalse(self.router._available("replica_1"))
+            self.assertFalse(self.router._available("replica_1"))
+        self.assertEqual(broken.ensure_connection.call_count, 1)
+
+    def test_reads_after_write_go_to_primary(self):
+        with mock.patch.object(self.router, "_available", return_value=True):
+            with request_scope(pinned=False) as state:
+                self.assertEqual(self.router.db_for_read(MenuItem), "replica_1")
+                self.assertEqual(self.router.db_for_write(MenuItem), "default")
+                self.assertEqual(self.router.db_for_read(MenuItem), "default")
+            self.assertTrue(state["wrote"])
+            self.assertNotEqual(self.router.db_for_read(MenuItem), "default")
+
+
+class ReplicaPinningMiddlewareTests(TestCase):
+    def test_unsafe_request_sets_pin_cookie(self):
+        self.assertNotIn(PIN_COOKIE, self.client.get("/").cookies)
+        self.assertIn(PIN_COOKIE, self.client.post("/").cookies)
+
+
+@override_settings(MENUS_CACHE_ENABLED=True)
+class CachedMenuReplicaTests(TestCase):
+    """
+    Пересборка дерева для процессного кэша после новой версии не должна читать
+    реплику: отстающая реплика отдала бы старое меню, и оно осталось бы в кэше
+    под новой версией до следующей правки.
+    """
+
+    def setUp(self):
+        menu_cache.clear()
+        cache.clear()
+        self.menu = Menu.objects.create(title="Main", slug="main_menu")
+        MenuItem.objects.create(menu=self.menu, title="Old", url="/old/")
+
+    def test_rebuild_after_version_bump_reads_primary(self):
+        menu_cache.get("main_menu")
+        # правка в другом процессе: новая версия уже опубликована, реплика ещё без строки
+        new = MenuItem.objects.create(menu=self.menu, title="New", url="/new/")
+        cache.incr("menus:version:main_menu")
+
+        def lagging(router, model, **hints):
+            # реплика «отстаёт»: любое чтение меню с неё — устаревшие данные
+            if model._meta.app_label == "menus":
+                self.fail(f"{model.__name__} прочитан с отстающей реплики")
+            return "default"
+
+        with mock.patch.object(MenuReplicaRouter, "db_for_read", autospec=True, side_effect=lagging):
+            rebuilt = menu_cache.get("main_menu")
+        self.assertIn(new.id, rebuilt.items)
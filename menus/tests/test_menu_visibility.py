@@ -0,0 +1,88 @@
+from django.contrib.auth.models import AnonymousUser, Group, Permission, User
+from django.core.cache import cache
+from django.template import RequestContext, Template
+from django.test import RequestFactory, TestCase, override_settings
+
+from menus.cache import compile_many, menu_cache
+from menus.models import Menu, MenuItem
+from menus.visibility import audience_key, hidden_ids
+
+
+class MenuVisibilityTests(TestCase):
+    """
+    Видимость пунктов по аудитории: гости, авторизованные, группы и права.
+    Маска вычисляется один раз на (версия меню, аудитория).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.menu = Menu.objects.create(title="Main", slug="main_menu")
+        cls.public = MenuItem.objects.create(menu=cls.menu, title="Public", url="/public/", order=0)
+        cls.members = MenuItem.objects.create(
+            menu=cls.menu, title="Members", url="/members/", order=1,
+            visibility=MenuItem.Visibility.AUTHENTICATED,
+        )
+        cls.members_child = MenuItem.objects.create(menu=cls.menu, parent=cls.members, title="MembersChild", url="/members/c/")
+        cls.staff = MenuItem.objects.create(
+            menu=cls.menu, title="Staff", url="/staff/", order=2,
+            visibility=MenuItem.Visibility.RESTRICTED,
+        )
+        cls.editors = Group.objects.create(name="editors")
+        cls.staff.groups.add(cls.editors)
+        cls.reports = MenuItem.objects.create(
+            menu=cls.menu, title="Reports", url="/reports/", order=3,
+            visibility=MenuItem.Visibility.RESTRICTED,
+        )
+        cls.reports.permissions.add(Permission.objects.get(codename="view_menu"))
+
+        cls.user = User.objects.create_user("user")
+        cls.editor = User.objects.create_user("editor")
+        cls.editor.groups.add(cls.editors)
+
+    def setUp(self):
+        menu_cache.clear()
+        cache.clear()
+
+    def _render(self, user, path: str = "/") -> str:
+        request = RequestFactory().get(path)
+        request.user = user
+        return Template("{% draw_menu 'main_menu' %}").render(RequestContext(request, {}))
+
+    def test_anonymous_sees_only_public(self):
+        html = self._render(AnonymousUser())
+        self.assertIn("Public", html)
+        for title in ("Members", "Staff", "Reports"):
+            self.assertNotIn(title, html)
+
+    def test_hidden_subtree_is_never_active(self):
+        html = self._render(AnonymousUser(), "/members/c/")
+        self.assertNotIn("MembersChild", html)
+        self.assertNotIn('class="active"', html)
+
+    def test_groups_and_permissions(self):
+        html = self._render(User.objects.get(pk=self.user.pk))
+        self.assertIn("Members", html)
+        self.assertNotIn("Staff", html)
+        html = self._render(User.objects.get(pk=self.editor.pk))
+        self.assertIn("Staff", html)
+        self.assertNotIn("Reports", html)
+
+        self.user.user_permissions.add(Permission.objects.get(codename="view_menu"))
+        html = self._render(User.objects.get(pk=self.user.pk))
+        self.assertIn("Reports", html)
+
+    def test_mask_shared_between_users_of_same_audience(self):
+        menu = compile_many(["main_menu"])["main_menu"]
+        other = User.objects.create_user("other")
+        first = hidden_ids(menu, User.objects.get(pk=self.user.pk))
+        self.assertEqual(audience_key(menu, self.user), audience_key(menu, other))
+        self.assertIs(hidden_ids(menu, other), first)
+
+    @override_settings(MENUS_CACHE_ENABLED=True)
+    def test_group_change_invalidates_cached_menu(self):
+        self.assertNotIn("Staff", self._render(User.objects.get(pk=self.user.pk)))
+        other_group = Group.objects.create(name="others")
+        self.user.groups.add(other_group)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.groups.add(other_group)
+        self.assertIn("Staff", self._render(User.objects.get(pk=self.user.pk)))
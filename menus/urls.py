@@ -0,0 +1,10 @@
+# menus/urls.py
+from django.urls import path
+
+from menus.views import menu_fragment, menu_sitemap
+
+urlpatterns = [
+    path("<slug:slug>/", menu_fragment, name="menu_fragment"),
+    path("<slug:slug>/v<int:version>/", menu_fragment, name="menu_fragment_version"),
+    path("<slug:slug>/sitemap.xml", menu_sitemap, name="menu_sitemap"),
+]
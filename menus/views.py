@@ -1,5 +1,18 @@
 # menus/views.py
-from django.shortcuts import render
+from django.conf import settings
+from xml.sax.saxutils import escape
+
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from menus.cache import cache_enabled, compile_many, current_language, menu_cache
+from menus.compiled import CompiledMenu
+from menus.models import Menu
+from menus.visibility import hidden_ids
+from menus.templatetags.menu_tags import render_static_menu
+
 
 def catalog_stub(request, *args, **kwargs):
     """
@@ -7,3 +20,104 @@ def catalog_stub(request, *args, **kwargs):
     Рендерит только меню и ничего больше.
     """
     return render(request, 'menus/catalog_stub.html')
+
+
+def _require_menu(slug: str) -> None:
+    """
+    404 для несуществующего меню — до обращения к кэшу: иначе случайные slug
+    заполняли бы LRU процесса пустыми деревьями и вытесняли горячие меню.
+    """
+    if cache_enabled() and menu_cache.contains(slug):
+        return
+    if not Menu.objects.filter(slug=slug).exists():
+        raise Http404("Меню не найдено")
+
+
+@require_GET
+def menu_fragment(request, slug, version=None):
+    """
+    Фрагмент меню без состояния запроса для кэширования на CDN.
+      - /menus/<slug>/        — текущая версия, короткий max-age + ETag;
+      - /menus/<slug>/v<N>/   — неизменяемая версия, кэшируется «навсегда»;
+        устаревшая версия перенаправляет на актуальную.
+    Активный пункт проставляет menus/js/menu.js на клиенте.
+    """
+    _require_menu(slug)
+    max_age = getattr(settings, "MENUS_FRAGMENT_MAX_AGE", 60)
+    if not cache_enabled():
+        # без кэша версии не публикуются — отдаём как «текущую» с коротким max-age
+        menu = compile_many([slug], language=current_language())[slug]
+        response = HttpResponse(render_static_menu(menu))
+        patch_cache_control(response, public=True, max_age=max_age)
+        return response
+
+    menu = menu_cache.get(slug)
+    if version is not None and version != menu.version:
+        response = redirect("menu_fragment_version", slug=slug, version=menu.version)
+        patch_cache_control(response, public=True, max_age=max_age)
+        return response
+
+    # язык в ETag: с LocaleMiddleware один URL фрагмента отдаётся на разных языках
+    etag = f'"{slug}-{menu.version}-{menu.language or ""}"'
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified(headers={"ETag": etag})
+
+    response = HttpResponse(render_static_menu(menu))
+    response.headers["ETag"] = etag
+    if version is not None:
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def _sitemap_urls(menu: CompiledMenu):
+    # Обход без материализации списка узлов; дубликаты URL внутри меню
+    # отдаются один раз (канонический — с минимальным id). Только пункты, видимые гостю.
+    hidden = hidden_ids(menu, None)
+    for item_id, _ in menu.walk():
+        url = menu.urls[item_id]
+        if item_id not in hidden and url.startswith("/") and min(menu.url_index[url] - hidden) == item_id:
+            yield url
+
+
+def _sitemap_stream(request, slugs, use_cache: bool):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    # URL, общий для нескольких меню, отдаётся один раз
+    emitted = set()
+    for slug in slugs:
+        if use_cache:
+            menu = menu_cache.get(slug)
+        else:
+            menu = compile_many([slug], language=current_language())[slug]
+        for url in _sitemap_urls(menu):
+            if url not in emitted:
+                emitted.add(url)
+                yield f"<url><loc>{escape(request.build_absolute_uri(url))}</loc></url>\n"
+    yield "</urlset>\n"
+
+
+@require_GET
+def menu_sitemap(request, slug=None):
+    """
+    Потоковый sitemap.xml из скомпилированных деревьев меню.
+    /sitemap.xml — меню из MENUS_SITEMAP (по умолчанию все),
+    /menus/<slug>/sitemap.xml — одно меню.
+    Обход итеративный, XML отдаётся по строкам; в памяти — одно дерево и множество
+    уже отданных URL.
+    Обход всех меню идёт мимо процессного кэша, иначе sitemap вытеснил бы из LRU
+    горячие меню: каждое дерево собирается отдельно и сразу освобождается.
+    """
+    use_cache = cache_enabled()
+    if slug is not None:
+        _require_menu(slug)
+        slugs = [slug]
+    else:
+        slugs = getattr(settings, "MENUS_SITEMAP", None)
+        if slugs is None:
+            slugs = list(Menu.objects.order_by("slug").values_list("slug", flat=True))
+            use_cache = False
+    return StreamingHttpResponse(
+        _sitemap_stream(request, slugs, use_cache), content_type="application/xml; charset=utf-8"
+    )
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from menus.compiled import CompiledMenu, ItemRule
+from menus.models import MenuItem
+
+# Сколько масок (аудиторий) держим на одну версию меню
+MAX_MASKS_PER_MENU = 256
+
+_RESTRICTED = MenuItem.Visibility.RESTRICTED
+_AUTHENTICATED = MenuItem.Visibility.AUTHENTICATED
+
+
+def load_rules(items: Iterable[MenuItem], using: Optional[str] = None) -> Dict[int, ItemRule]:
+    """
+    Правила видимости для непубличных пунктов. Группы и права читаются
+    только если среди пунктов есть RESTRICTED (два запроса на все меню сразу).
+    """
+    rules: Dict[int, ItemRule] = {}
+    restricted: Set[int] = set()
+    menu_ids: Set[int] = set()
+    for it in items:
+        if it.visibility == _AUTHENTICATED:
+            rules[it.id] = ItemRule(_AUTHENTICATED)
+        elif it.visibility == _RESTRICTED:
+            restricted.add(it.id)
+            menu_ids.add(it.menu_id)
+    if not restricted:
+        return rules
+
+    groups: Dict[int, Set[int]] = defaultdict(set)
+    perms: Dict[int, Set[str]] = defaultdict(set)
+    scope = {"menuitem__menu_id__in": menu_ids, "menuitem__visibility": _RESTRICTED}
+    for item_id, group_id in MenuItem.groups.through.objects.db_manager(using).filter(**scope).values_list("menuitem_id", "group_id"):
+        groups[item_id].add(group_id)
+    rows = MenuItem.permissions.through.objects.db_manager(using).filter(**scope).values_list(
+        "menuitem_id", "permission__content_type__app_label", "permission__codename"
+    )
+    for item_id, app_label, codename in rows:
+        perms[item_id].add(f"{app_label}.{codename}")
+
+    for item_id in restricted:
+        rules[item_id] = ItemRule(_RESTRICTED, frozenset(groups[item_id]), frozenset(perms[item_id]))
+    return rules
+
+
+def _user_group_ids(user) -> FrozenSet[int]:
+    # Кэшируется на объекте пользователя, как и права в ModelBackend
+    cached = getattr(user, "_menus_group_ids", None)
+    if cached is None:
+        cached = frozenset(user.groups.values_list("id", flat=True))
+        user._menus_group_ids = cached
+    return cached
+
+
+def audience_key(menu: CompiledMenu, user) -> Tuple:
+    """
+    Ключ аудитории: всё, от чего зависит видимость пунктов ИМЕННО этого меню.
+    Пользователи с одинаковыми значимыми группами/правами делят одну маску.
+    Пустой кортеж — в меню нет правил, фильтровать нечего.
+    """
+    if not menu.rules:
+        return ()
+    if user is None or not user.is_authenticated:
+        return ("anonymous",)
+    if user.is_superuser:
+        return ("superuser",)
+    if menu.rule_refs is None:
+        menu.rule_refs = (
+            frozenset().union(*(r.groups for r in menu.rules.values())),
+            frozenset().union(*(r.permissions for r in menu.rules.values())),
+        )
+    rule_groups, rule_perms = menu.rule_refs
+    groups = _user_group_ids(user) & rule_groups if rule_groups else frozenset()
+    perms = frozenset(p for p in rule_perms if user.has_perm(p))
+    return ("authenticated", frozenset(groups), perms)
+
+
+def _is_visible(rule: ItemRule, key: Tuple) -> bool:
+    kind = key[0]
+    if kind == "superuser":
+        return True
+    if kind == "anonymous":
+        return False
+    if rule.visibility == _AUTHENTICATED:
+        return True
+    return bool(rule.groups & key[1] or rule.permissions & key[2])
+
+
+def hidden_ids(menu: CompiledMenu, user) -> FrozenSet[int]:
+    """
+    Скрытые для пользователя пункты (вместе с поддеревьями) — вычисляются
+    один раз на (версия меню, аудитория) и дальше проверяются поиском в множестве.
+    """
+    key = audience_key(menu, user)
+    if not key:
+        return frozenset()
+    mask = menu.masks.get(key)
+    if mask is not None:
+        return mask
+
+    hidden: Set[int] = set()
+    for item_id, _ in menu.walk():
+        rule = menu.rules.get(item_id)
+        if menu.parents[item_id] in hidden or (rule is not None and not _is_visible(rule, key)):
+            hidden.add(item_id)
+    mask = frozenset(hidden)
+    if len(menu.masks) >= MAX_MASKS_PER_MENU:
+        menu.masks = {}
+    menu.masks[key] = mask
+    return mask